@@ -0,0 +1,159 @@
+"""
+Asynchronous, batched writer for audit_log.
+
+Routes call record() after a change has been committed. The event, along
+with the user, IP address and user agent of the current request, goes
+onto a bounded in-memory queue and the route moves on. One thread per
+process takes events off the queue and inserts them with a single
+executemany in one transaction once AUDIT_BATCH_SIZE events are waiting
+or the oldest has waited AUDIT_FLUSH_SECONDS, whichever comes first. A
+batch that fails to commit is retried on the next flush.
+
+The queue is drained when the process exits. If writes fall so far behind
+that the queue fills up, further events are dropped and counted rather
+than slowing requests down.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import has_request_context, request, session
+
+import db_pool
+
+BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 200))
+FLUSH_SECONDS = float(os.environ.get('AUDIT_FLUSH_SECONDS', 1.0))
+QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+
+# How long an exiting process waits for queued events to be written
+DRAIN_SECONDS = 5.0
+
+INSERT_SQL = '''
+    INSERT INTO audit_log (table_name, record_id, action, old_values, new_values,
+                           changed_by, changed_at, ip_address, user_agent)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+logger = logging.getLogger(__name__)
+
+# Asks the writer thread to flush whatever it holds
+_FLUSH = object()
+
+
+def _json(values):
+    return None if values is None else json.dumps(values, default=str, sort_keys=True)
+
+
+class AuditLog:
+    """Bounded queue of audit events drained by one writer thread per process."""
+
+    def __init__(self, db_path=None, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS,
+                 queue_size=QUEUE_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each gunicorn worker starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue(self.queue_size)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+                self._thread.start()
+
+    def record(self, table_name, record_id, action, old_values=None, new_values=None):
+        """Queue one change; the current request supplies user, IP and user agent."""
+        if has_request_context():
+            changed_by = session.get('user_id')
+            ip_address = request.remote_addr
+            user_agent = request.user_agent.string or None
+        else:
+            changed_by = ip_address = user_agent = None
+        row = (table_name, str(record_id), action, _json(old_values), _json(new_values), changed_by,
+               datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'), ip_address, user_agent)
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self, timeout=DRAIN_SECONDS):
+        """Flush what is queued and wait for it to be written (atexit)."""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(_FLUSH, timeout=timeout)
+        except queue.Full:
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and self._thread.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _write(self, rows):
+        conn = db_pool.get_connection(self.db_path)
+        try:
+            conn.executemany(INSERT_SQL, rows)
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.warning('Writing %d audit events failed, will retry: %s', len(rows), e)
+            return False
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _FLUSH:
+                self._queue.task_done()
+            elif item is not None:
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+                if len(pending) < self.batch_size:
+                    continue
+
+            if not pending:
+                deadline = None
+                continue
+            if self._write(pending):
+                written, pending, deadline = len(pending), [], None
+            else:
+                deadline = time.monotonic() + self.flush_seconds
+                # Do not hold more than a queue's worth while the database is unavailable
+                written = max(len(pending) - self.queue_size, 0)
+                self.dropped += written
+                pending = pending[written:]
+            for _ in range(written):
+                self._queue.task_done()
+
+
+_log = AuditLog()
+atexit.register(_log.drain)
+
+
+def record(table_name, record_id, action, old_values=None, new_values=None):
+    """Queue an audit event on the process-wide writer."""
+    _log.record(table_name, record_id, action, old_values, new_values)
@@ -0,0 +1,229 @@
+"""
+Online database backups through the SQLite backup API.
+
+A backup copies the live database a few pages at a time with a short
+sleep between steps, so it can run during opening hours without holding
+up requests. The source connection keeps one read transaction open for
+the whole copy: under WAL that pins a consistent snapshot (including
+what is still in the -wal file) without blocking writers, and the copy
+never has to restart because someone wrote to the database meanwhile.
+
+Each backup is written under a temporary name and renamed into place once
+complete, optionally gzip-compressed. snapshot() takes a backup and
+prunes the oldest ones beyond BACKUP_KEEP; that is what the scheduled job
+calls. Restoring always runs PRAGMA integrity_check on the copy first.
+
+Usage:
+    python backup.py create [--compress] [--keep N]
+    python backup.py list
+    python backup.py verify BACKUP
+    python backup.py restore BACKUP --to PATH [--force]
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+import db_pool
+
+BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', 256))
+STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP_MS', 20)) / 1000.0
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 14))
+COMPRESS = os.environ.get('BACKUP_COMPRESS', '0') == '1'
+
+FILE_PREFIX = 'bloodbank_backup_'
+
+
+class BackupError(Exception):
+    """Raised when a backup cannot be created, verified or restored."""
+
+
+def _backup_name(compress):
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{FILE_PREFIX}{timestamp}.db{'.gz' if compress else ''}"
+
+
+def create_backup(db_path=None, backup_dir=None, compress=COMPRESS,
+                  pages=PAGES_PER_STEP, step_sleep=STEP_SLEEP):
+    """Copy the live database into backup_dir and return the backup's path."""
+    db_path = db_path or db_pool.DB_PATH
+    backup_dir = backup_dir or BACKUP_DIR
+    if not os.path.exists(db_path):
+        raise BackupError(f'Database not found: {db_path}')
+    os.makedirs(backup_dir, exist_ok=True)
+
+    final_path = os.path.join(backup_dir, _backup_name(compress))
+    partial = os.path.join(backup_dir, f'.{os.path.basename(final_path)}.partial')
+
+    def throttle(status, remaining, total):
+        if remaining:
+            time.sleep(step_sleep)
+
+    source = sqlite3.connect(db_path, isolation_level=None)
+    target = sqlite3.connect(partial, isolation_level=None)
+    try:
+        source.execute(f"PRAGMA busy_timeout = {dict(db_pool.PRAGMAS)['busy_timeout']}")
+        # Pin one snapshot for the whole copy
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        source.backup(target, pages=pages, progress=throttle)
+        source.execute('COMMIT')
+        # A standalone file: no -wal next to the copy
+        target.execute('PRAGMA journal_mode = DELETE')
+    except sqlite3.Error as e:
+        target.close()
+        os.remove(partial)
+        raise BackupError(f'Backup failed: {e}')
+    finally:
+        source.close()
+        target.close()
+
+    if compress:
+        with open(partial, 'rb') as raw, gzip.open(f'{partial}.gz', 'wb') as packed:
+            shutil.copyfileobj(raw, packed)
+        os.remove(partial)
+        partial = f'{partial}.gz'
+    os.replace(partial, final_path)
+    return final_path
+
+
+def list_backups(backup_dir=None):
+    """Completed backups in backup_dir, oldest first."""
+    backup_dir = backup_dir or BACKUP_DIR
+    return sorted(glob.glob(os.path.join(backup_dir, f'{FILE_PREFIX}*.db'))
+                  + glob.glob(os.path.join(backup_dir, f'{FILE_PREFIX}*.db.gz')),
+                  key=os.path.basename)
+
+
+def prune(backup_dir=None, keep=BACKUP_KEEP):
+    """Delete all but the newest keep backups; returns the removed paths."""
+    backups = list_backups(backup_dir)
+    removed = backups[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def snapshot(db_path=None, backup_dir=None, compress=COMPRESS, keep=BACKUP_KEEP):
+    """Take a backup and apply the retention policy (the scheduled job)."""
+    path = create_backup(db_path, backup_dir, compress)
+    prune(backup_dir, keep)
+    return path
+
+
+def _expand(backup_path, directory):
+    """A plain database file with the backup's contents, created in directory."""
+    fd, path = tempfile.mkstemp(suffix='.db', prefix='.restore_', dir=directory)
+    with os.fdopen(fd, 'wb') as out:
+        opener = gzip.open if backup_path.endswith('.gz') else open
+        with opener(backup_path, 'rb') as src:
+            shutil.copyfileobj(src, out)
+    return path
+
+
+def integrity_check(path):
+    """PRAGMA integrity_check on a database file; returns the list of problems."""
+    conn = sqlite3.connect(path)
+    try:
+        rows = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        conn.close()
+    return [] if rows == ['ok'] else rows
+
+
+def verify(backup_path):
+    """Check a backup without restoring it; returns the list of problems."""
+    if not os.path.exists(backup_path):
+        raise BackupError(f'Backup not found: {backup_path}')
+    path = _expand(backup_path, tempfile.gettempdir())
+    try:
+        return integrity_check(path)
+    finally:
+        os.remove(path)
+
+
+def restore(backup_path, target_path, force=False):
+    """
+    Restore a backup to target_path after verifying the copy.
+
+    The app must not be running against target_path. Refuses to replace an
+    existing file unless force is set.
+    """
+    if not os.path.exists(backup_path):
+        raise BackupError(f'Backup not found: {backup_path}')
+    if os.path.exists(target_path) and not force:
+        raise BackupError(f'{target_path} exists; pass force to replace it')
+
+    directory = os.path.dirname(os.path.abspath(target_path))
+    path = _expand(backup_path, directory)
+    problems = integrity_check(path)
+    if problems:
+        os.remove(path)
+        raise BackupError('Integrity check failed: ' + '; '.join(problems[:5]))
+
+    # Stale WAL files would be replayed over the restored database
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(target_path + suffix):
+            os.remove(target_path + suffix)
+    os.replace(path, target_path)
+    return target_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Online backups of the blood bank database')
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    parser.add_argument('--dir', default=None, help='Backup directory (defaults to BACKUP_DIR)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    create = commands.add_parser('create', help='Take a backup and prune old ones')
+    create.add_argument('--compress', action='store_true', default=COMPRESS)
+    create.add_argument('--keep', type=int, default=BACKUP_KEEP)
+
+    commands.add_parser('list', help='List backups')
+
+    check = commands.add_parser('verify', help='Run an integrity check on a backup')
+    check.add_argument('backup')
+
+    restore_cmd = commands.add_parser('restore', help='Verify a backup and restore it')
+    restore_cmd.add_argument('backup')
+    restore_cmd.add_argument('--to', required=True, help='Database path to restore to')
+    restore_cmd.add_argument('--force', action='store_true', help='Replace an existing file')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'create':
+            started = time.monotonic()
+            path = snapshot(args.db, args.dir, args.compress, args.keep)
+            print(f"✅ Backup created: {path} ({os.path.getsize(path)} bytes, "
+                  f"{time.monotonic() - started:.1f}s)")
+        elif args.command == 'list':
+            for path in list_backups(args.dir):
+                print(f"{path}  {os.path.getsize(path)} bytes")
+        elif args.command == 'verify':
+            problems = verify(args.backup)
+            if problems:
+                print(f"❌ {args.backup} failed the integrity check:")
+                for problem in problems[:20]:
+                    print(f"   {problem}")
+                return 1
+            print(f"✅ {args.backup} passed the integrity check")
+        else:
+            restore(args.backup, args.to, args.force)
+            print(f"✅ Restored {args.backup} to {args.to}")
+    except BackupError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,287 @@
+"""
+Blood unit lots and the FIFO-by-expiry allocation engine.
+
+Every donation (or manual stock addition) becomes a lot in ``blood_units``
+with its own expiry date. Stock is issued oldest-expiry-first with a single
+range scan over idx_blood_units_allocation (blood_group, status,
+expiry_date), so fresher units are never used ahead of ones about to
+expire.
+
+``inventory.units_available`` is derived from the lots: triggers add or
+remove a lot's remaining units whenever it enters or leaves the
+'available' status, so every writer keeps the two in step. Since
+inventory_ledger.py those triggers also append each change to
+inventory_ledger; the functions here attribute their changes with
+inventory_ledger.context().
+
+Lot statuses:
+    available   in stock and allocatable
+    reserved    set aside for a request (reserved_for holds the reference)
+    issued      fully consumed
+    expired     retired by the expiry sweep
+
+Whether a lot has expired is always judged against expiry_today(), passed
+into SQL as a parameter, never against DATE('now').
+"""
+
+from datetime import date, timedelta
+
+import db_pool
+import inventory_ledger
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS blood_units (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    blood_group TEXT NOT NULL,
+    donation_id TEXT,
+    source TEXT NOT NULL DEFAULT 'donation',
+    units_total INTEGER NOT NULL,
+    units_remaining INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'available',
+    collected_date DATE,
+    expiry_date DATE,
+    reserved_for TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_blood_units_allocation ON blood_units(blood_group, status, expiry_date);
+CREATE INDEX IF NOT EXISTS idx_blood_units_donation ON blood_units(donation_id);
+CREATE INDEX IF NOT EXISTS idx_blood_units_reserved_for ON blood_units(reserved_for);
+
+CREATE TABLE IF NOT EXISTS unit_issues (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    unit_id INTEGER NOT NULL,
+    blood_group TEXT NOT NULL,
+    units INTEGER NOT NULL,
+    reason TEXT,
+    reference_id TEXT,
+    issued_by TEXT,
+    issued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (unit_id) REFERENCES blood_units(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_unit_issues_group_date ON unit_issues(blood_group, issued_at);
+'''
+
+# Existing stock has no lot history; carry it over as one lot per group with
+# an unknown expiry. NULL sorts first, so these units are issued first.
+OPENING_LOTS = '''
+INSERT INTO blood_units (blood_group, source, units_total, units_remaining, status)
+SELECT blood_group, 'opening', units_available, units_available, 'available'
+FROM inventory
+WHERE units_available > 0;
+'''
+
+# inventory_ledger.py replaces these with versions that also write the ledger
+TRIGGERS = '''
+CREATE TRIGGER IF NOT EXISTS blood_units_stock_insert AFTER INSERT ON blood_units
+WHEN new.status = 'available' BEGIN
+    UPDATE inventory SET units_available = units_available + new.units_remaining,
+                         last_updated = CURRENT_TIMESTAMP
+    WHERE blood_group = new.blood_group;
+END;
+
+CREATE TRIGGER IF NOT EXISTS blood_units_stock_delete AFTER DELETE ON blood_units
+WHEN old.status = 'available' BEGIN
+    UPDATE inventory SET units_available = units_available - old.units_remaining,
+                         last_updated = CURRENT_TIMESTAMP
+    WHERE blood_group = old.blood_group;
+END;
+
+CREATE TRIGGER IF NOT EXISTS blood_units_stock_update
+AFTER UPDATE OF units_remaining, status, blood_group ON blood_units
+WHEN old.status = 'available' OR new.status = 'available' BEGIN
+    UPDATE inventory SET units_available = units_available - old.units_remaining,
+                         last_updated = CURRENT_TIMESTAMP
+    WHERE blood_group = old.blood_group AND old.status = 'available';
+    UPDATE inventory SET units_available = units_available + new.units_remaining,
+                         last_updated = CURRENT_TIMESTAMP
+    WHERE blood_group = new.blood_group AND new.status = 'available';
+END;
+'''
+
+
+def expiry_today():
+    """
+    The day expiry is judged on.
+
+    Expiry dates are local calendar days (see stock.calculate_expiry_date),
+    so this is the local date; SQLite's DATE('now') is UTC and would
+    disagree around midnight.
+    """
+    return date.today()
+
+
+def expiring_window(days):
+    """(first, last) ISO days of the expiry window starting today."""
+    today = expiry_today()
+    return today.isoformat(), (today + timedelta(days=days)).isoformat()
+
+
+class InsufficientUnits(ValueError):
+    """Raised when there are not enough allocatable units for a request."""
+
+
+def ensure_schema(conn):
+    """Create the lot tables and triggers, carrying current stock over on first run."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blood_units'"
+    ).fetchone()
+    # Opening lots must be inserted before the triggers exist, or stock doubles
+    script = SCHEMA + TRIGGERS if exists else SCHEMA + OPENING_LOTS + TRIGGERS
+    db_pool.run_script(conn, script)
+
+
+def add_lots(conn, lots, created_by=None):
+    """
+    Insert available lots in the caller's transaction.
+
+    Each lot is a dict with blood_group and units, plus optional
+    donation_id, source, collected_date and expiry_date. created_by is
+    recorded against them in the inventory ledger.
+    """
+    with inventory_ledger.context(conn, recorded_by=created_by):
+        conn.executemany('''
+            INSERT INTO blood_units (blood_group, donation_id, source, units_total, units_remaining,
+                                     status, collected_date, expiry_date)
+            VALUES (?, ?, ?, ?, ?, 'available', ?, ?)
+        ''', [(lot['blood_group'], lot.get('donation_id'), lot.get('source', 'donation'),
+               lot['units'], lot['units'], lot.get('collected_date'), lot.get('expiry_date'))
+              for lot in lots])
+
+
+def plan_allocation(conn, blood_group, units):
+    """
+    Pick lots to cover units, oldest expiry first, without changing anything.
+
+    Returns a list of (lot_row, units_taken). Lots already past their expiry
+    date are skipped. Raises InsufficientUnits if stock cannot cover it.
+    """
+    cursor = conn.execute('''
+        SELECT id, donation_id, units_remaining, expiry_date
+        FROM blood_units
+        WHERE blood_group = ? AND status = 'available'
+          AND (expiry_date IS NULL OR expiry_date >= ?)
+        ORDER BY expiry_date
+    ''', (blood_group, expiry_today().isoformat()))
+
+    plan = []
+    needed = units
+    for lot in cursor:
+        take = min(needed, lot['units_remaining'])
+        plan.append((lot, take))
+        needed -= take
+        if needed == 0:
+            break
+    cursor.close()
+
+    if needed > 0:
+        raise InsufficientUnits(f'Not enough {blood_group} units available')
+    return plan
+
+
+def issue_units(conn, blood_group, units, reason='issue', reference_id=None, issued_by=None):
+    """
+    Issue units FIFO by expiry and return what was taken.
+
+    Returns a list of dicts with unit_id, donation_id, units and expiry_date.
+    """
+    plan = plan_allocation(conn, blood_group, units)
+    consume(conn, blood_group, plan, reason, reference_id, issued_by)
+    return [{'unit_id': lot['id'], 'donation_id': lot['donation_id'], 'units': take,
+             'expiry_date': lot['expiry_date']} for lot, take in plan]
+
+
+def consume(conn, blood_group, plan, reason, reference_id=None, issued_by=None):
+    """Apply an allocation plan of (lot, units) pairs and log each issue."""
+    with inventory_ledger.context(conn, reason, reference_id, issued_by):
+        conn.executemany('''
+            UPDATE blood_units
+            SET units_remaining = units_remaining - ?,
+                status = CASE WHEN units_remaining - ? = 0 THEN 'issued' ELSE status END
+            WHERE id = ?
+        ''', [(take, take, lot['id']) for lot, take in plan])
+    conn.executemany('''
+        INSERT INTO unit_issues (unit_id, blood_group, units, reason, reference_id, issued_by)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [(lot['id'], blood_group, take, reason, reference_id, issued_by) for lot, take in plan])
+
+
+def reserve_units(conn, blood_group, units, reference_id):
+    """
+    Set units aside for reference_id, oldest expiry first.
+
+    Partially used lots are split so the reserved part becomes its own lot.
+    Returns the ids of the reserved lots.
+    """
+    plan = plan_allocation(conn, blood_group, units)
+    reserved = []
+    # A split shrinks the available lot, which the ledger would take for an issue
+    with inventory_ledger.context(conn, 'reserved', reference_id):
+        for lot, take in plan:
+            if take == lot['units_remaining']:
+                conn.execute("UPDATE blood_units SET status = 'reserved', reserved_for = ? WHERE id = ?",
+                             (reference_id, lot['id']))
+                reserved.append(lot['id'])
+            else:
+                conn.execute('UPDATE blood_units SET units_remaining = units_remaining - ? WHERE id = ?',
+                             (take, lot['id']))
+                cursor = conn.execute('''
+                    INSERT INTO blood_units (blood_group, donation_id, source, units_total, units_remaining,
+                                             status, collected_date, expiry_date, reserved_for)
+                    SELECT blood_group, donation_id, source, ?, ?, 'reserved', collected_date,
+                           expiry_date, ?
+                    FROM blood_units WHERE id = ?
+                ''', (take, take, reference_id, lot['id']))
+                reserved.append(cursor.lastrowid)
+    return reserved
+
+
+def issue_reserved(conn, reference_id, reason='issue', issued_by=None):
+    """Issue every lot reserved for reference_id and return what was taken."""
+    lots = conn.execute('''
+        SELECT id, blood_group, donation_id, units_remaining, expiry_date
+        FROM blood_units
+        WHERE reserved_for = ? AND status = 'reserved'
+    ''', (reference_id,)).fetchall()
+    for lot in lots:
+        consume(conn, lot['blood_group'], [(lot, lot['units_remaining'])],
+                 reason, reference_id, issued_by)
+    return [{'unit_id': lot['id'], 'donation_id': lot['donation_id'],
+             'units': lot['units_remaining'], 'expiry_date': lot['expiry_date']} for lot in lots]
+
+
+def release_reserved(conn, reference_id):
+    """Return lots reserved for reference_id to available stock."""
+    conn.execute('''
+        UPDATE blood_units SET status = 'available', reserved_for = NULL
+        WHERE reserved_for = ? AND status = 'reserved'
+    ''', (reference_id,))
+
+
+def rebuild_inventory(conn):
+    """Recompute inventory.units_available from the lots, logging corrections in the ledger."""
+    # Measured against the ledger's balance, so its deltas keep summing to the stock
+    conn.execute('''
+        INSERT INTO inventory_ledger (blood_group, delta, balance, reason)
+        SELECT blood_group, lots - COALESCE(logged, 0), lots, 'rebuild'
+        FROM (
+            SELECT blood_group, (
+                SELECT COALESCE(SUM(units_remaining), 0) FROM blood_units
+                WHERE blood_units.blood_group = inventory.blood_group AND status = 'available'
+            ) AS lots, (
+                SELECT balance FROM inventory_ledger
+                WHERE inventory_ledger.blood_group = inventory.blood_group
+                ORDER BY recorded_at DESC, id DESC LIMIT 1
+            ) AS logged
+            FROM inventory
+        )
+        WHERE lots IS NOT logged
+    ''')
+    conn.execute('''
+        UPDATE inventory
+        SET units_available = (
+            SELECT COALESCE(SUM(units_remaining), 0) FROM blood_units
+            WHERE blood_units.blood_group = inventory.blood_group AND status = 'available'
+        )
+    ''')
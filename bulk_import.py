@@ -0,0 +1,325 @@
+"""
+Bulk donor and donation import for blood-drive spreadsheets.
+
+Accepts CSV or XLSX files with a header row. Recognised columns:
+
+    name, dob (or date_of_birth), gender, blood_group, city, phone,
+    email, medical_details, units_donated, donation_date, notes, donor_id
+
+A row without donor_id registers a new donor; a row with the donor_id of
+an existing donor only records a donation. When units_donated is present
+a donation is recorded as well (donation_date defaults to today), unless
+the donor is ineligible: a new donor is then still registered, with
+eligible = 0, and the line is reported without its donation.
+
+Rows are validated and written in chunks: each chunk is one transaction
+using executemany, with one stock status refresh per blood group.
+Rejected rows are reported with their line number and reason.
+
+Imports open their own transactions rather than going through write_queue:
+a chunk of up to CHUNK_SIZE rows would hold up every request write batched
+behind it, and the command-line import runs outside the app entirely.
+Every chunk is rolled back on any error, so a failed import leaves no
+partial chunk and no open transaction on the request's connection.
+
+Usage:
+    python bulk_import.py camp_data.csv [--received-by NAME] [--chunk-size N]
+"""
+
+import argparse
+import csv
+import io
+import os
+import sqlite3
+from datetime import date, datetime
+
+import db_pool
+import id_allocator
+import stock
+from eligibility import calculate_age, is_age_eligible
+
+CHUNK_SIZE = 1000
+GENDERS = ('Male', 'Female', 'Other')
+REQUIRED_FIELDS = ('name', 'dob', 'gender', 'blood_group', 'city', 'phone')
+COLUMN_ALIASES = {'date_of_birth': 'dob', 'units': 'units_donated'}
+
+# SQLite builds before 3.32 allow at most 999 bound parameters
+MAX_PARAMS = 500
+
+
+class ImportReport:
+    """Running totals for an import."""
+
+    def __init__(self):
+        self.donors_added = 0
+        self.donations_added = 0
+        self.units_by_group = {}
+        self.rejected = []
+
+    def reject(self, line, reason):
+        self.rejected.append((line, reason))
+
+    def as_dict(self):
+        return {
+            'donors_added': self.donors_added,
+            'donations_added': self.donations_added,
+            'units_by_group': self.units_by_group,
+            'rejected': [{'line': line, 'reason': reason} for line, reason in self.rejected],
+        }
+
+
+def _clean_header(value):
+    key = str(value or '').strip().lower().replace(' ', '_')
+    return COLUMN_ALIASES.get(key, key)
+
+
+def _read_csv(stream):
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(stream)
+    header = [_clean_header(h) for h in next(reader, [])]
+    for line, values in enumerate(reader, start=2):
+        if any(v.strip() for v in values):
+            yield line, dict(zip(header, values))
+
+
+def _read_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('XLSX import requires the openpyxl package')
+
+    sheet = load_workbook(stream, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = [_clean_header(h) for h in next(rows, [])]
+    for line, values in enumerate(rows, start=2):
+        if any(v not in (None, '') for v in values):
+            yield line, dict(zip(header, values))
+
+
+def read_rows(stream, filename):
+    """Yield (line_number, row_dict) from a CSV or XLSX file object."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return _read_xlsx(stream)
+    return _read_csv(stream)
+
+
+def _text(row, field):
+    value = row.get(field)
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def _date(value, field):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'Invalid {field.replace("_", " ")} (expected YYYY-MM-DD)')
+
+
+def validate_row(row):
+    """Normalise one spreadsheet row, raising ValueError with the reason if invalid."""
+    record = {'donor_id': _text(row, 'donor_id')}
+
+    if not record['donor_id']:
+        for field in REQUIRED_FIELDS:
+            if not _text(row, field):
+                raise ValueError(f'Missing {field.replace("_", " ")}')
+
+        record['name'] = _text(row, 'name')
+        record['dob'] = _date(row['dob'], 'dob')
+        record['gender'] = _text(row, 'gender').capitalize()
+        record['blood_group'] = _text(row, 'blood_group').upper()
+        record['city'] = _text(row, 'city')
+        record['phone'] = _text(row, 'phone')
+        record['email'] = _text(row, 'email').lower()
+        record['medical_details'] = _text(row, 'medical_details')
+
+        if record['gender'] not in GENDERS:
+            raise ValueError(f'Invalid gender: {record["gender"]}')
+        if record['blood_group'] not in stock.BLOOD_GROUPS:
+            raise ValueError(f'Invalid blood group: {record["blood_group"]}')
+
+        # Same age and eligibility rules as the add donor form
+        record['age'] = calculate_age(record['dob'])
+        record['eligible'] = 1 if is_age_eligible(record['age']) else 0
+
+    units = _text(row, 'units_donated')
+    record['units_donated'] = None
+    if units:
+        try:
+            record['units_donated'] = int(float(units))
+        except ValueError:
+            raise ValueError(f'Invalid units donated: {units}')
+        if record['units_donated'] <= 0:
+            raise ValueError('Units donated must be positive')
+        donation_date = row.get('donation_date')
+        record['donation_date'] = (_date(donation_date, 'donation_date')
+                                   if _text(row, 'donation_date')
+                                   else datetime.today().strftime('%Y-%m-%d'))
+        record['notes'] = _text(row, 'notes')
+    elif record['donor_id']:
+        raise ValueError('Rows for existing donors need units donated')
+
+    return record
+
+
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _existing(conn, query, values):
+    """Run query (containing a {placeholders} slot) over values in slices."""
+    values = list(values)
+    found = {}
+    for start in range(0, len(values), MAX_PARAMS):
+        part = values[start:start + MAX_PARAMS]
+        sql = query.format(placeholders=', '.join('?' for _ in part))
+        for row in conn.execute(sql, part):
+            found[row[0]] = row
+    return found
+
+
+def _import_chunk(conn, chunk, received_by, report):
+    records = []
+    for line, row in chunk:
+        try:
+            records.append((line, validate_row(row)))
+        except ValueError as e:
+            report.reject(line, str(e))
+
+    known = _existing(conn, '''
+        SELECT donor_id, name, blood_group, eligible FROM donors
+        WHERE donor_id IN ({placeholders})
+    ''', {r['donor_id'] for _, r in records if r['donor_id']})
+
+    new_donors = []
+    donations = []
+    # Lines with something to write; only these can fail in the transaction
+    pending = []
+    for line, record in records:
+        if record['donor_id']:
+            donor = known.get(record['donor_id'])
+            if donor is None:
+                report.reject(line, f'Unknown donor ID: {record["donor_id"]}')
+                continue
+            record.update(name=donor['name'], blood_group=donor['blood_group'],
+                          eligible=donor['eligible'])
+        else:
+            new_donors.append(record)
+            pending.append(line)
+
+        if record['units_donated']:
+            if not record['eligible']:
+                # Like the add donor form, a new donor is still registered as ineligible
+                report.reject(line, 'Donor is not eligible to donate blood' if record['donor_id']
+                              else 'Donor added as ineligible; donation not recorded')
+                continue
+            donations.append(record)
+            if record['donor_id']:
+                pending.append(line)
+
+    if not new_donors and not donations:
+        return
+
+    donor_ids = id_allocator.allocate(conn, 'donor', len(new_donors))
+    donation_ids = id_allocator.allocate(conn, 'donation', len(donations))
+
+    for record, donor_id in zip(new_donors, donor_ids):
+        record['donor_id'] = donor_id
+
+    donation_rows = [{
+        'donation_id': donation_id,
+        'donor_id': record['donor_id'],
+        'blood_group': record['blood_group'],
+        'units_donated': record['units_donated'],
+        'donation_date': record['donation_date'],
+        'received_by': received_by,
+        'notes': record['notes'] or None,
+    } for record, donation_id in zip(donations, donation_ids)]
+
+    # Not a write_queue command; see the module docstring
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany('''
+            INSERT INTO donors (donor_id, name, date_of_birth, age, gender,
+                              blood_group, city, phone, email, medical_details, eligible)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(r['donor_id'], r['name'], r['dob'], r['age'], r['gender'], r['blood_group'],
+               r['city'], r['phone'], r['email'], r['medical_details'], r['eligible'])
+              for r in new_donors])
+        units_by_group = stock.record_donations(conn, donation_rows) if donation_rows else {}
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        # Nothing from these lines was written, including an ineligible donor already reported as added
+        failed = set(pending)
+        report.rejected = [(line, reason) for line, reason in report.rejected if line not in failed]
+        for line in pending:
+            report.reject(line, f'Database error: {e}')
+        return
+    except Exception:
+        conn.rollback()
+        raise
+
+    report.donors_added += len(new_donors)
+    report.donations_added += len(donation_rows)
+    for blood_group, units in units_by_group.items():
+        report.units_by_group[blood_group] = report.units_by_group.get(blood_group, 0) + units
+
+
+def import_rows(conn, rows, received_by, chunk_size=CHUNK_SIZE):
+    """Import (line, row) pairs in chunked transactions and return an ImportReport."""
+    report = ImportReport()
+    for chunk in _chunks(rows, chunk_size):
+        _import_chunk(conn, chunk, received_by, report)
+    report.rejected.sort()
+    return report
+
+
+def import_file(path, received_by, chunk_size=CHUNK_SIZE, db_path=None):
+    """Import a CSV or XLSX file from disk."""
+    conn = db_pool.get_connection(db_path)
+    with open(path, 'rb') as stream:
+        return import_rows(conn, read_rows(stream, os.path.basename(path)), received_by, chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import donors and donations')
+    parser.add_argument('file', help='CSV or XLSX file to import')
+    parser.add_argument('--received-by', default='Bulk Import', help='Staff name recorded on donations')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    args = parser.parse_args()
+
+    try:
+        report = import_file(args.file, args.received_by, args.chunk_size, args.db)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ Donors added: {report.donors_added}")
+    print(f"✅ Donations added: {report.donations_added}")
+    for blood_group, units in sorted(report.units_by_group.items()):
+        print(f"   {blood_group}: +{units} units")
+    if report.rejected:
+        print(f"⚠️ Rejected rows: {len(report.rejected)}")
+        for line, reason in report.rejected:
+            print(f"   line {line}: {reason}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,171 @@
+"""
+Trigger-maintained statistics counters.
+
+``stats_counters`` holds one row per statistic, kept exact by triggers on
+donors, donation_history and inventory, so the dashboard and
+DatabaseManager.get_statistics() read totals in O(1) instead of
+aggregating whole tables on every request.
+
+Counters:
+    total_donors, eligible_donors      donors
+    donors:<blood group>               donors per blood group
+    total_units, passed_units          units donated (all / test passed)
+    units:<blood group>                units donated per donor blood group
+    low_stock                          inventory rows with status 'Low Stock'
+    critical_inventory                 inventory rows 'Critical' or 'Low Stock'
+"""
+
+import db_pool
+
+
+def bump_sql(name_sql, delta_sql):
+    """SQL that adds delta_sql to the counter named by name_sql, creating it if needed."""
+    return (f"INSERT INTO stats_counters (name, value) VALUES ({name_sql}, {delta_sql}) "
+            f"ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;")
+
+
+def _donor_changes(row, sign):
+    return '\n    '.join([
+        bump_sql("'total_donors'", f'{sign}1'),
+        bump_sql("'eligible_donors'", f'{sign}({row}.eligible = 1)'),
+        bump_sql(f"'donors:' || {row}.blood_group", f'{sign}1'),
+    ])
+
+
+def _donation_changes(row, sign):
+    # Donations carry no blood group of their own; it is the donor's
+    return '\n    '.join([
+        bump_sql("'total_units'", f'{sign}{row}.units_donated'),
+        bump_sql("'passed_units'", f"{sign}(CASE WHEN {row}.test_result = 'Passed' THEN {row}.units_donated ELSE 0 END)"),
+        f"INSERT INTO stats_counters (name, value) "
+        f"SELECT 'units:' || blood_group, {sign}{row}.units_donated FROM donors WHERE donor_id = {row}.donor_id "
+        f"ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;",
+    ])
+
+
+def _donor_units(row, sign):
+    return (f"INSERT INTO stats_counters (name, value) "
+            f"SELECT 'units:' || {row}.blood_group, {sign}COALESCE(SUM(units_donated), 0) "
+            f"FROM donation_history WHERE donor_id = {row}.donor_id "
+            f"ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;")
+
+
+def _inventory_changes(row, sign):
+    return '\n    '.join([
+        bump_sql("'low_stock'", f"{sign}({row}.status = 'Low Stock')"),
+        bump_sql("'critical_inventory'", f"{sign}({row}.status IN ('Critical', 'Low Stock'))"),
+    ])
+
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS stats_donors_insert AFTER INSERT ON donors BEGIN
+    {_donor_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_donors_delete AFTER DELETE ON donors BEGIN
+    {_donor_changes('old', '-')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_donors_update AFTER UPDATE OF eligible, blood_group ON donors BEGIN
+    {_donor_changes('old', '-')}
+    {_donor_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_donors_regroup AFTER UPDATE OF blood_group ON donors
+WHEN old.blood_group IS NOT new.blood_group BEGIN
+    {_donor_units('old', '-')}
+    {_donor_units('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_donations_insert AFTER INSERT ON donation_history BEGIN
+    {_donation_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_donations_delete AFTER DELETE ON donation_history BEGIN
+    {_donation_changes('old', '-')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_donations_update
+AFTER UPDATE OF units_donated, test_result, donor_id ON donation_history BEGIN
+    {_donation_changes('old', '-')}
+    {_donation_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_inventory_insert AFTER INSERT ON inventory BEGIN
+    {_inventory_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_inventory_delete AFTER DELETE ON inventory BEGIN
+    {_inventory_changes('old', '-')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_inventory_update AFTER UPDATE OF status ON inventory BEGIN
+    {_inventory_changes('old', '-')}
+    {_inventory_changes('new', '+')}
+END;
+'''
+
+# donors_version:<blood group> counters are cache versions (donor_ranking.py),
+# not statistics; resetting one could make a stale cache look current
+REBUILD = '''
+DELETE FROM stats_counters WHERE name NOT LIKE 'donors!_version:%' ESCAPE '!';
+
+INSERT INTO stats_counters (name, value)
+SELECT 'total_donors', COUNT(*) FROM donors
+UNION ALL
+SELECT 'eligible_donors', COUNT(*) FROM donors WHERE eligible = 1
+UNION ALL
+SELECT 'total_units', COALESCE(SUM(units_donated), 0) FROM donation_history
+UNION ALL
+SELECT 'passed_units', COALESCE(SUM(units_donated), 0) FROM donation_history WHERE test_result = 'Passed'
+UNION ALL
+SELECT 'low_stock', COUNT(*) FROM inventory WHERE status = 'Low Stock'
+UNION ALL
+SELECT 'critical_inventory', COUNT(*) FROM inventory WHERE status IN ('Critical', 'Low Stock');
+
+INSERT INTO stats_counters (name, value)
+SELECT 'donors:' || blood_group, COUNT(*) FROM donors GROUP BY blood_group;
+
+INSERT INTO stats_counters (name, value)
+SELECT 'units:' || d.blood_group, SUM(dh.units_donated)
+FROM donation_history dh JOIN donors d ON d.donor_id = dh.donor_id
+GROUP BY d.blood_group;
+'''
+
+
+def ensure_schema(conn):
+    """Create the counters table and triggers, seeding it on first run."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_counters'"
+    ).fetchone()
+    # Triggers and the initial counts must appear together, or writes in between are lost
+    script = SCHEMA if exists else SCHEMA + REBUILD
+    db_pool.run_script(conn, script)
+
+
+def rebuild(conn):
+    """Recompute every counter from the base tables."""
+    conn.executescript('BEGIN IMMEDIATE;' + REBUILD + 'COMMIT;')
+
+
+def read(conn, *names):
+    """Return {name: value} for the given counters (missing ones read as 0)."""
+    values = dict.fromkeys(names, 0)
+    rows = conn.execute(
+        f"SELECT name, value FROM stats_counters WHERE name IN ({', '.join('?' for _ in names)})",
+        names).fetchall()
+    values.update((row[0], row[1]) for row in rows)
+    return values
+
+
+def read_prefix(conn, prefix):
+    """Return {suffix: value} for every counter named '<prefix>:<suffix>'."""
+    rows = conn.execute(
+        "SELECT name, value FROM stats_counters WHERE name >= ? AND name < ?",
+        (prefix + ':', prefix + ';')).fetchall()
+    return {row[0][len(prefix) + 1:]: row[1] for row in rows}
@@ -0,0 +1,243 @@
+"""
+Per-thread SQLite connection pool for the Blood Bank system.
+
+Each gunicorn worker thread keeps one long-lived connection per database
+file. Pragmas are applied once when the connection is opened, and calling
+close() on a pooled connection only rolls back any unfinished transaction
+and hands it back to the pool, so existing ``conn.close()`` calls in the
+routes keep working unchanged.
+
+Cursors on pooled connections time themselves: once a statement is done
+(its rows are exhausted, or the cursor is reused, closed or dropped) each
+function in ``observers`` is called with the database path, the SQL, its
+parameters, the seconds spent inside SQLite and the number of rows
+fetched. Iterating such a cursor fetches ITER_BATCH rows at a time, so
+the timing is per batch rather than per row. While ``observers`` is
+empty, connections hand out plain sqlite3 cursors.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DB_PATH = os.environ.get('DATABASE_PATH', 'bloodbank.db')
+
+# Applied once per connection, right after it is opened
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -int(os.environ.get('SQLITE_CACHE_KB', 20000))),
+    ('mmap_size', int(os.environ.get('SQLITE_MMAP_BYTES', 256 * 1024 * 1024))),
+    ('busy_timeout', int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+    ('temp_store', 'MEMORY'),
+)
+
+_local = threading.local()
+
+# Called as observer(db_path, sql, params, seconds, rows) for each finished statement
+observers = []
+
+# Rows a PooledCursor fetches at a time while it is iterated
+ITER_BATCH = 256
+
+
+class PooledCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's time and row count to the observers."""
+
+    _statement = None
+    _elapsed = 0.0
+    _rows = 0
+    # Rows fetched ahead by iteration, in reverse so the next one is last
+    _ahead = ()
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - start
+
+    def _finish(self):
+        if self._statement is None:
+            return
+        sql, params = self._statement
+        elapsed, rows = self._elapsed, self._rows
+        self._statement = None
+        self._elapsed = 0.0
+        self._rows = 0
+        for observer in observers:
+            observer(self.connection.db_path, sql, params, elapsed, rows)
+
+    def _take_ahead(self, size=None):
+        ahead = self._ahead
+        if size is None or size >= len(ahead):
+            self._ahead = ()
+            return ahead[::-1]
+        rows = ahead[:-size - 1:-1]
+        del ahead[-size:]
+        return rows
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._ahead = ()
+        self._statement = (sql, parameters)
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        self._ahead = ()
+        self._statement = (sql, None)
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        if self._ahead:
+            return self._ahead.pop()
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = list(self._take_ahead(size))
+        if len(rows) < size:
+            more = self._timed(super().fetchmany, size - len(rows))
+            self._rows += len(more)
+            rows += more
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = list(self._take_ahead())
+        more = self._timed(super().fetchall)
+        self._rows += len(more)
+        self._finish()
+        return rows + more
+
+    def __next__(self):
+        # Iteration fetches in batches, so rows are timed per batch, not one by one
+        ahead = self._ahead
+        if not ahead:
+            ahead = self._timed(super().fetchmany, ITER_BATCH)
+            self._rows += len(ahead)
+            if len(ahead) < ITER_BATCH:
+                self._finish()
+            if not ahead:
+                raise StopIteration
+            ahead.reverse()
+            self._ahead = ahead
+        return ahead.pop()
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class PooledConnection(sqlite3.Connection):
+    """A connection whose close() returns it to the pool instead of closing."""
+
+    db_path = None
+
+    def cursor(self, factory=None):
+        # With nobody observing, a plain cursor skips the bookkeeping
+        if factory is None:
+            factory = PooledCursor if observers else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        """Discard any uncommitted work and keep the connection alive."""
+        if self.in_transaction:
+            self.rollback()
+
+    def dispose(self):
+        """Really close the underlying database handle."""
+        sqlite3.Connection.close(self)
+
+
+def _open(db_path):
+    conn = sqlite3.connect(db_path, factory=PooledConnection)
+    conn.db_path = db_path
+    conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def _pool():
+    # A forked worker must not reuse handles opened by its parent
+    pid = os.getpid()
+    if getattr(_local, 'pid', None) != pid:
+        _local.pid = pid
+        _local.connections = {}
+    return _local.connections
+
+
+def get_connection(db_path=None):
+    """Return this thread's connection to db_path, opening it on first use."""
+    db_path = db_path or DB_PATH
+    connections = _pool()
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = _open(db_path)
+        connections[db_path] = conn
+    return conn
+
+
+def release(exc=None):
+    """Flask teardown hook: roll back anything the request left open."""
+    for conn in _pool().values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def close_all():
+    """Close every connection held by the current thread."""
+    connections = _pool()
+    for conn in connections.values():
+        try:
+            conn.dispose()
+        except sqlite3.Error:
+            pass
+    connections.clear()
+
+
+def run_script(conn, script):
+    """
+    Run a multi-statement SQL script inside the caller's transaction.
+
+    Unlike Connection.executescript() this does not commit first, so schema
+    changes can be applied atomically together with other statements.
+    """
+    statement = ''
+    for piece in script.split(';'):
+        statement += piece + ';'
+        # Semicolons inside trigger bodies or strings leave it incomplete
+        if sqlite3.complete_statement(statement):
+            if statement.strip(' \t\r\n;'):
+                conn.execute(statement)
+            statement = ''
+
+
+def init_app(app):
+    """Register the pool's teardown handler on a Flask app."""
+    app.teardown_appcontext(release)
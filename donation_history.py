@@ -0,0 +1,96 @@
+"""
+Normalized donation_history: donations reference donors only by donor_id.
+
+Older databases copied donor_name and blood_group onto every donation, so
+editing a donor rewrote their whole history and /history had to reconcile
+both copies. ensure_schema() drops the copies with a table rebuild, and
+name and blood group are read through a join served by a covering index
+on donors(donor_id, name, blood_group).
+
+``donation_history_details`` is a view with the old column set for
+reports that still expect donor_name and blood_group on each donation.
+"""
+
+import re
+
+import db_pool
+
+DROPPED_COLUMNS = ('donor_name', 'blood_group')
+COVERING_INDEX = 'idx_donors_donor_id_name_blood_group'
+
+SCHEMA = f'''
+CREATE INDEX IF NOT EXISTS {COVERING_INDEX} ON donors(donor_id, name, blood_group);
+CREATE INDEX IF NOT EXISTS idx_donation_history_donor_id ON donation_history(donor_id, donation_date);
+
+CREATE VIEW IF NOT EXISTS donation_history_details AS
+SELECT dh.*, d.name AS donor_name, d.blood_group AS blood_group
+FROM donation_history dh
+LEFT JOIN donors d ON d.donor_id = dh.donor_id;
+'''
+
+# Views from database_setup.py that read the dropped columns, rewritten
+# against donation_history_details
+DEPENDENT_VIEWS = {
+    'monthly_donation_summary': '''
+CREATE VIEW IF NOT EXISTS monthly_donation_summary AS
+SELECT
+    strftime('%Y-%m', donation_date) as month,
+    blood_group,
+    COUNT(*) as total_donations,
+    SUM(units_donated) as total_units,
+    AVG(units_donated) as avg_units_per_donation
+FROM donation_history_details
+WHERE test_result = 'Passed'
+GROUP BY strftime('%Y-%m', donation_date), blood_group;
+''',
+}
+
+
+def ensure_schema(conn):
+    """Drop the denormalized donor columns if present, then add the index and view."""
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(donation_history)')]
+    if any(column in columns for column in DROPPED_COLUMNS):
+        _drop_donor_copies(conn, columns)
+    db_pool.run_script(conn, SCHEMA)
+
+    # Without statistics the planner prefers the unique primary key index
+    # over the covering one for the donor lookup
+    has_stats = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone() and conn.execute(
+        'SELECT 1 FROM sqlite_stat1 WHERE idx = ?', (COVERING_INDEX,)
+    ).fetchone()
+    if not has_stats:
+        conn.execute('ANALYZE donors')
+
+
+def _drop_donor_copies(conn, columns):
+    """Rebuild donation_history without donor_name and blood_group."""
+    create_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'donation_history'"
+    ).fetchone()[0]
+    # Every schema this has shipped with declares one column per line
+    pattern = re.compile(r'\s*({})\b'.format('|'.join(DROPPED_COLUMNS)))
+    create_sql = '\n'.join(line for line in create_sql.splitlines() if not pattern.match(line))
+    create_sql = create_sql.replace('donation_history', 'donation_history_new', 1)
+    kept = ', '.join(column for column in columns if column not in DROPPED_COLUMNS)
+
+    views = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'view' AND name IN ({})".format(
+            ', '.join('?' for _ in DEPENDENT_VIEWS)), list(DEPENDENT_VIEWS))]
+
+    # Indexes and triggers go with the old table; later migrations recreate
+    # them. legacy_alter_table stops the rename from re-checking views.
+    conn.execute('PRAGMA legacy_alter_table = ON')
+    try:
+        db_pool.run_script(conn, f'''
+            {''.join(f'DROP VIEW {name};' for name in views)}
+            {create_sql};
+            INSERT INTO donation_history_new ({kept}) SELECT {kept} FROM donation_history;
+            DROP TABLE donation_history;
+            ALTER TABLE donation_history_new RENAME TO donation_history;
+            {SCHEMA}
+            {''.join(DEPENDENT_VIEWS[name] for name in views)}
+        ''')
+    finally:
+        conn.execute('PRAGMA legacy_alter_table = OFF')
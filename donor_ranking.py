@@ -0,0 +1,223 @@
+"""
+Vectorized donor ranking for emergency recall lists.
+
+For each blood group the columns needed for ranking are held in compact
+NumPy arrays, loaded once per process and reloaded only when a ranked
+column of a donor in that group changes (tracked by the trigger-maintained
+'donors_version:<blood group>' counters). A search scores every candidate in the recipient's compatible
+groups in one vectorized pass and returns the top K.
+
+Donors are only candidates when eligible and past the 56-day interval
+since their last donation. The score favours, in order: exact group over
+compatible groups, a matching city, more days since the last donation and
+donors in the 25-45 age band.
+"""
+
+import threading
+from datetime import date
+
+import numpy as np
+
+import counters
+import db_pool
+import matching
+from eligibility import DONATION_INTERVAL_DAYS
+
+DEFAULT_LIMIT = 50
+
+# Score weights
+EXACT_GROUP_WEIGHT = 1000.0
+CITY_MATCH_WEIGHT = 200.0
+RECENCY_WEIGHT = 100.0
+RECENCY_CAP_DAYS = 365
+AGE_BAND_WEIGHTS = ((25, 45, 20.0), (18, 24, 10.0), (46, 55, 10.0))
+
+# Day number used for donors who have never donated
+NEVER_DONATED = -(10 ** 6)
+
+_VERSION_TRIGGERS = ''.join(f'''
+CREATE TRIGGER IF NOT EXISTS donor_ranking_version_{event.lower()} AFTER {event} ON donors BEGIN
+    {counters.bump_sql("'donors_version'", '1')}
+END;
+''' for event in ('INSERT', 'UPDATE', 'DELETE'))
+
+SCHEMA = '''
+CREATE INDEX IF NOT EXISTS idx_donors_blood_group ON donors(blood_group);
+''' + _VERSION_TRIGGERS
+
+# The donor columns _GroupArrays is built from
+RANKED_COLUMNS = ('donor_id', 'blood_group', 'age', 'eligible', 'city', 'last_donation_date')
+
+
+def _bump_group(row):
+    return counters.bump_sql(f"'donors_version:' || {row}.blood_group", '1')
+
+
+# Replace the whole-table version with one per blood group, bumped only when
+# a ranked column really changes (edits to a name or phone leave it alone)
+GROUP_VERSION_TRIGGERS = f'''
+DROP TRIGGER IF EXISTS donor_ranking_version_insert;
+DROP TRIGGER IF EXISTS donor_ranking_version_delete;
+DROP TRIGGER IF EXISTS donor_ranking_version_update;
+DELETE FROM stats_counters WHERE name = 'donors_version';
+
+CREATE TRIGGER donor_ranking_version_insert AFTER INSERT ON donors BEGIN
+    {_bump_group('new')}
+END;
+
+CREATE TRIGGER donor_ranking_version_delete AFTER DELETE ON donors BEGIN
+    {_bump_group('old')}
+END;
+
+CREATE TRIGGER donor_ranking_version_update AFTER UPDATE OF {', '.join(RANKED_COLUMNS)} ON donors
+WHEN {' OR '.join(f'old.{column} IS NOT new.{column}' for column in RANKED_COLUMNS)} BEGIN
+    {_bump_group('old')}
+    INSERT INTO stats_counters (name, value)
+    SELECT 'donors_version:' || new.blood_group, 1 WHERE new.blood_group IS NOT old.blood_group
+    ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;
+END;
+'''
+
+
+def ensure_schema(conn):
+    """Create the blood group index and the donors_version triggers."""
+    db_pool.run_script(conn, SCHEMA)
+
+
+def ensure_group_versions(conn):
+    """Replace the donors_version triggers with per blood group versions."""
+    db_pool.run_script(conn, GROUP_VERSION_TRIGGERS)
+
+
+class _GroupArrays:
+    """Ranking columns for the donors of one blood group."""
+
+    __slots__ = ('donor_ids', 'last_day', 'age', 'eligible', 'city_codes', 'cities')
+
+    def __init__(self, rows):
+        self.cities = []
+        city_index = {}
+        codes = []
+        for row in rows:
+            city = (row['city'] or '').lower()
+            if city not in city_index:
+                city_index[city] = len(self.cities)
+                self.cities.append(city)
+            codes.append(city_index[city])
+
+        self.donor_ids = np.array([row['donor_id'] for row in rows], dtype=object)
+        self.last_day = np.array([NEVER_DONATED if row['last_day'] is None else row['last_day']
+                                  for row in rows], dtype=np.int32)
+        self.age = np.array([row['age'] or 0 for row in rows], dtype=np.int16)
+        self.eligible = np.array([bool(row['eligible']) for row in rows], dtype=bool)
+        self.city_codes = np.array(codes, dtype=np.int32)
+
+
+class DonorRankingCache:
+    """Per-process cache of _GroupArrays, each invalidated by its group's donors_version."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {}
+
+    def group(self, conn, blood_group):
+        with self._lock:
+            name = f'donors_version:{blood_group}'
+            version = counters.read(conn, name)[name]
+            cached = self._groups.get(blood_group)
+            if cached is not None and cached[0] == version:
+                arrays = cached[1]
+            else:
+                rows = conn.execute('''
+                    SELECT donor_id, age, eligible, city,
+                           CAST(julianday(last_donation_date) AS INTEGER) AS last_day
+                    FROM donors
+                    WHERE blood_group = ?
+                ''', (blood_group,)).fetchall()
+                arrays = _GroupArrays(rows)
+                self._groups[blood_group] = (version, arrays)
+            return arrays
+
+
+_cache = DonorRankingCache()
+
+
+def _age_scores(age):
+    scores = np.zeros(age.shape, dtype=np.float64)
+    for low, high, weight in AGE_BAND_WEIGHTS:
+        scores[(age >= low) & (age <= high)] = weight
+    return scores
+
+
+def rank_donors(conn, recipient_group, city='', limit=DEFAULT_LIMIT, today=None):
+    """
+    Return the top `limit` donors for a recipient group as dicts.
+
+    Each dict has the donor columns shown on the search page plus
+    'score', 'days_since_donation' and 'compatibility' ('exact' or
+    'compatible').
+    """
+    today = today or date.today()
+    today_day = int(today.toordinal() + 1721424.5)  # julian day number at midnight
+    city = city.strip().lower()
+
+    ids, scores, days_since, exact = [], [], [], []
+    for donor_group in matching.DONOR_PREFERENCE.get(recipient_group, ()):
+        arrays = _cache.group(conn, donor_group)
+        if not len(arrays.donor_ids):
+            continue
+
+        days = today_day - arrays.last_day
+        mask = arrays.eligible & (days >= DONATION_INTERVAL_DAYS)
+        if not mask.any():
+            continue
+
+        is_exact = donor_group == recipient_group
+        score = np.minimum(days, RECENCY_CAP_DAYS) * (RECENCY_WEIGHT / RECENCY_CAP_DAYS)
+        score = score + _age_scores(arrays.age)
+        if is_exact:
+            score = score + EXACT_GROUP_WEIGHT
+        if city:
+            # Substring match per distinct city, then broadcast through the codes
+            city_hits = np.array([city in c for c in arrays.cities], dtype=bool)
+            score = score + city_hits[arrays.city_codes] * CITY_MATCH_WEIGHT
+
+        ids.append(arrays.donor_ids[mask])
+        scores.append(score[mask])
+        days_since.append(days[mask])
+        exact.append(np.full(int(mask.sum()), is_exact))
+
+    if not ids:
+        return []
+
+    ids = np.concatenate(ids)
+    scores = np.concatenate(scores)
+    days_since = np.concatenate(days_since)
+    exact = np.concatenate(exact)
+
+    if len(scores) > limit:
+        top = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top], kind='stable')]
+
+    chosen = [str(donor_id) for donor_id in ids[top]]
+    rows = conn.execute(f'''
+        SELECT donor_id, name, age, gender, blood_group, city, phone, email, eligible,
+               last_donation_date
+        FROM donors
+        WHERE donor_id IN ({', '.join('?' for _ in chosen)})
+    ''', chosen).fetchall()
+    details = {row['donor_id']: dict(row) for row in rows}
+
+    ranked = []
+    for i, donor_id in zip(top, chosen):
+        donor = details.get(donor_id)
+        if donor is None:
+            continue
+        never = days_since[i] > RECENCY_CAP_DAYS * 100
+        donor['score'] = round(float(scores[i]), 1)
+        donor['days_since_donation'] = None if never else int(days_since[i])
+        donor['compatibility'] = 'exact' if exact[i] else 'compatible'
+        ranked.append(donor)
+    return ranked
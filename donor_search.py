@@ -0,0 +1,121 @@
+"""
+Full-text donor search backed by an FTS5 trigram index.
+
+``donors_fts`` is an external-content FTS5 table over donors(donor_id, name,
+phone, city), keyed by the donors rowid and kept in sync by triggers. The
+trigram tokenizer answers the same substring questions as ``LIKE '%x%'``
+without scanning the donors table.
+
+The trigram tokenizer cannot match terms shorter than three characters, so
+those (and SQLite builds without FTS5) fall back to the original LIKE
+filters. Run rebuild_index() after a VACUUM, which may renumber rowids.
+"""
+
+import sqlite3
+
+import db_pool
+
+MIN_TRIGRAM_LENGTH = 3
+
+SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS donors_fts USING fts5(
+    donor_id, name, phone, city,
+    content='donors', content_rowid='rowid', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS donors_fts_insert AFTER INSERT ON donors BEGIN
+    INSERT INTO donors_fts (rowid, donor_id, name, phone, city)
+    VALUES (new.rowid, new.donor_id, new.name, new.phone, new.city);
+END;
+
+CREATE TRIGGER IF NOT EXISTS donors_fts_delete AFTER DELETE ON donors BEGIN
+    INSERT INTO donors_fts (donors_fts, rowid, donor_id, name, phone, city)
+    VALUES ('delete', old.rowid, old.donor_id, old.name, old.phone, old.city);
+END;
+
+CREATE TRIGGER IF NOT EXISTS donors_fts_update
+AFTER UPDATE OF donor_id, name, phone, city ON donors BEGIN
+    INSERT INTO donors_fts (donors_fts, rowid, donor_id, name, phone, city)
+    VALUES ('delete', old.rowid, old.donor_id, old.name, old.phone, old.city);
+    INSERT INTO donors_fts (rowid, donor_id, name, phone, city)
+    VALUES (new.rowid, new.donor_id, new.name, new.phone, new.city);
+END;
+'''
+
+_available = None
+
+
+def ensure_schema(conn):
+    """Create the FTS index and its triggers, populating it on first run."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'donors_fts'"
+    ).fetchone()
+    try:
+        db_pool.run_script(conn, SCHEMA)
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5 or the trigram tokenizer (< 3.34)
+        print(f"Donor search index unavailable: {e}")
+        return False
+    if not exists:
+        rebuild_index(conn)
+    return True
+
+
+def rebuild_index(conn):
+    """Repopulate donors_fts from the donors table."""
+    conn.execute("INSERT INTO donors_fts (donors_fts) VALUES ('rebuild')")
+
+
+def is_available(conn):
+    """Whether donors_fts exists in this database (checked once per process)."""
+    global _available
+    if _available is None:
+        _available = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'donors_fts'"
+        ).fetchone() is not None
+    return _available
+
+
+def _phrase(columns, term):
+    # Quote the term as an FTS5 string so punctuation is matched literally
+    quoted = '"' + term.replace('"', '""') + '"'
+    return f'{{{columns}}} : {quoted}'
+
+
+def donor_filter(conn, search='', blood_group='', city='', alias=''):
+    """
+    Build the WHERE conditions for the /donors filters.
+
+    Returns (conditions, params) where conditions is a list of SQL snippets
+    to be AND-ed together against the donors table (optionally aliased).
+    """
+    prefix = f'{alias}.' if alias else ''
+    conditions = []
+    params = []
+    phrases = []
+
+    use_fts = is_available(conn)
+
+    if search:
+        if use_fts and len(search) >= MIN_TRIGRAM_LENGTH:
+            phrases.append(_phrase('donor_id name phone', search))
+        else:
+            conditions.append(f'({prefix}name LIKE ? OR {prefix}donor_id LIKE ? OR {prefix}phone LIKE ?)')
+            params.extend([f'%{search}%', f'%{search}%', f'%{search}%'])
+
+    if city:
+        if use_fts and len(city) >= MIN_TRIGRAM_LENGTH:
+            phrases.append(_phrase('city', city))
+        else:
+            conditions.append(f'{prefix}city LIKE ?')
+            params.append(f'%{city}%')
+
+    if phrases:
+        conditions.insert(0, f'{prefix}rowid IN (SELECT rowid FROM donors_fts WHERE donors_fts MATCH ?)')
+        params.insert(0, ' AND '.join(phrases))
+
+    if blood_group:
+        conditions.append(f'{prefix}blood_group = ?')
+        params.append(blood_group)
+
+    return conditions, params
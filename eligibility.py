@@ -0,0 +1,27 @@
+"""
+Donor age and eligibility rules.
+"""
+
+from datetime import datetime
+
+MIN_DONOR_AGE = 18
+MAX_DONOR_AGE = 65
+
+# Minimum days between whole blood donations
+DONATION_INTERVAL_DAYS = 56
+
+
+def calculate_age(dob):
+    """Age in whole years for a YYYY-MM-DD date of birth (0 if unparseable)."""
+    try:
+        birth_date = datetime.strptime(dob, '%Y-%m-%d')
+        today = datetime.today()
+        age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+        return age
+    except:
+        return 0
+
+
+def is_age_eligible(age):
+    """Donors must be between 18 and 65 years old."""
+    return MIN_DONOR_AGE <= age <= MAX_DONOR_AGE
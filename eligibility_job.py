@@ -0,0 +1,188 @@
+"""
+Nightly recomputation of donor age, eligibility and next_eligible_date.
+
+``donors.age`` and ``donors.eligible`` are set when a donor is added or
+edited and go stale as donors have birthdays. This job recomputes them
+for every donor with a few set-based statements per chunk of rowids, each
+chunk in its own short transaction so the write lock is never held long.
+
+Only the age rule is applied automatically: donors outside 18-65 become
+ineligible, and donors who were ineligible only because of their age
+become eligible again once they are in range. A manual deferral (eligible
+cleared on the edit page) is left alone. Every eligibility change is
+written to ``donor_eligibility_log``.
+
+``next_eligible_date`` is kept by triggers: for an eligible donor it is
+the later of their 18th birthday and 56 days after their last donation,
+and NULL for an ineligible donor. Finding donors who can give today is
+then an index range scan on (blood_group, next_eligible_date).
+
+Usage:
+    python eligibility_job.py [--date YYYY-MM-DD] [--chunk-size N] [--db PATH]
+"""
+
+import argparse
+from datetime import date
+
+import db_pool
+from eligibility import DONATION_INTERVAL_DAYS, MAX_DONOR_AGE, MIN_DONOR_AGE
+
+CHUNK_SIZE = 5000
+
+
+def _next_eligible(row):
+    """SQL for a donor's next eligible date from the row's own columns."""
+    return f'''CASE WHEN {row}eligible THEN NULLIF(MAX(
+        COALESCE(DATE({row}date_of_birth, '+{MIN_DONOR_AGE} years'), ''),
+        COALESCE(DATE({row}last_donation_date, '+{DONATION_INTERVAL_DAYS} days'), '')), '') END'''
+
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS donor_eligibility_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    donor_id VARCHAR(10) NOT NULL,
+    eligibility_status BOOLEAN NOT NULL,
+    reason TEXT,
+    checked_by INTEGER,
+    checked_date DATE DEFAULT CURRENT_DATE,
+    next_eligible_date DATE,
+    FOREIGN KEY (donor_id) REFERENCES donors(donor_id) ON DELETE CASCADE,
+    FOREIGN KEY (checked_by) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_donor_eligibility_log_donor ON donor_eligibility_log(donor_id);
+CREATE INDEX IF NOT EXISTS idx_donors_next_eligible ON donors(blood_group, next_eligible_date);
+
+CREATE TRIGGER IF NOT EXISTS donors_next_eligible_insert AFTER INSERT ON donors BEGIN
+    UPDATE donors SET next_eligible_date = {_next_eligible('new.')} WHERE rowid = new.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS donors_next_eligible_update
+AFTER UPDATE OF eligible, date_of_birth, last_donation_date ON donors BEGIN
+    UPDATE donors SET next_eligible_date = {_next_eligible('new.')} WHERE rowid = new.rowid;
+END;
+'''
+
+BACKFILL = f'''
+ALTER TABLE donors ADD COLUMN next_eligible_date DATE;
+UPDATE donors SET next_eligible_date = {_next_eligible('')};
+'''
+
+# Whole years between date_of_birth and :today (0 if the date is unparseable)
+_AGE = '''COALESCE(CAST(STRFTIME('%Y', :today) AS INTEGER) - CAST(STRFTIME('%Y', date_of_birth) AS INTEGER)
+        - (STRFTIME('%m-%d', :today) < STRFTIME('%m-%d', date_of_birth)), 0)'''
+
+_IN_RANGE = f'BETWEEN {MIN_DONOR_AGE} AND {MAX_DONOR_AGE}'
+
+COLLECT_CHANGES = f'''
+INSERT INTO temp.eligibility_changes (donor_rowid, age, eligible, was_eligible)
+SELECT rowid, new_age, new_eligible, eligible
+FROM (SELECT rowid, age, eligible, new_age,
+             CASE WHEN new_age NOT {_IN_RANGE} THEN 0
+                  WHEN COALESCE(age {_IN_RANGE}, 0) = 0 THEN 1
+                  ELSE eligible END AS new_eligible
+      FROM (SELECT rowid, age, eligible, {_AGE} AS new_age
+            FROM donors WHERE rowid BETWEEN :low AND :high))
+WHERE new_age IS NOT age OR new_eligible IS NOT eligible
+'''
+
+APPLY_CHANGES = '''
+UPDATE donors
+SET age = (SELECT age FROM temp.eligibility_changes WHERE donor_rowid = donors.rowid),
+    eligible = (SELECT eligible FROM temp.eligibility_changes WHERE donor_rowid = donors.rowid)
+WHERE rowid IN (SELECT donor_rowid FROM temp.eligibility_changes)
+'''
+
+LOG_CHANGES = f'''
+INSERT INTO donor_eligibility_log (donor_id, eligibility_status, reason, checked_date, next_eligible_date)
+SELECT d.donor_id, c.eligible,
+       CASE WHEN c.age < {MIN_DONOR_AGE} THEN 'Under minimum age'
+            WHEN c.age > {MAX_DONOR_AGE} THEN 'Over maximum age'
+            ELSE 'Reached minimum age' END,
+       :today, d.next_eligible_date
+FROM temp.eligibility_changes c
+JOIN donors d ON d.rowid = c.donor_rowid
+WHERE c.eligible IS NOT c.was_eligible
+'''
+
+
+class RecomputeReport:
+    """Counts from one run of the job."""
+
+    def __init__(self):
+        self.donors_checked = 0
+        self.donors_updated = 0
+        self.eligibility_changed = 0
+
+    def as_dict(self):
+        return {
+            'donors_checked': self.donors_checked,
+            'donors_updated': self.donors_updated,
+            'eligibility_changed': self.eligibility_changed,
+        }
+
+
+def ensure_schema(conn):
+    """Add next_eligible_date with its index and triggers, and the eligibility log."""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(donors)')}
+    # The column and its initial values must appear together with the triggers
+    script = SCHEMA if 'next_eligible_date' in columns else BACKFILL + SCHEMA
+    db_pool.run_script(conn, script)
+
+
+def recompute(conn, today=None, chunk_size=CHUNK_SIZE):
+    """Recompute age and eligibility for all donors, one transaction per chunk."""
+    today = (today or date.today()).isoformat()
+    report = RecomputeReport()
+    conn.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS eligibility_changes (
+            donor_rowid INTEGER PRIMARY KEY,
+            age INTEGER,
+            eligible BOOLEAN,
+            was_eligible BOOLEAN
+        )
+    ''')
+
+    low, high, report.donors_checked = conn.execute(
+        'SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM donors').fetchone()
+    if low is None:
+        return report
+
+    for start in range(low, high + 1, chunk_size):
+        params = {'today': today, 'low': start, 'high': start + chunk_size - 1}
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM temp.eligibility_changes')
+            conn.execute(COLLECT_CHANGES, params)
+            report.donors_updated += conn.execute(APPLY_CHANGES).rowcount
+            report.eligibility_changed += conn.execute(LOG_CHANGES, params).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute donor age and eligibility')
+    parser.add_argument('--date', type=date.fromisoformat, default=None,
+                        help='Day to compute ages for (defaults to today)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    args = parser.parse_args()
+
+    # Imported here because migrations imports this module
+    import migrations
+    migrations.migrate(args.db)
+
+    conn = db_pool.get_connection(args.db)
+    report = recompute(conn, args.date, args.chunk_size)
+
+    print(f"✅ Donors checked: {report.donors_checked}")
+    print(f"✅ Donors updated: {report.donors_updated}")
+    print(f"✅ Eligibility changes logged: {report.eligibility_changed}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
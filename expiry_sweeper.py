@@ -0,0 +1,124 @@
+"""
+Expiry sweep: retire blood unit lots once they pass their expiry date.
+
+Lots stay 'available' until something moves them, so without a sweep
+expired units keep counting towards inventory.units_available. One sweep
+is a single transaction of set-based statements over the lots that are
+still available but expired before today, found through
+idx_blood_units_allocation (blood_group, status, expiry_date); lots
+retired by an earlier sweep are 'expired' and never read again.
+
+For those lots the sweep
+    - logs each discard in unit_issues with reason 'expired',
+    - adds the units to inventory.units_expired per blood group,
+    - sets the lots to 'expired', which takes their units out of
+      units_available and logs them in inventory_ledger through the
+      blood_units triggers,
+    - refreshes the status of every blood group it touched.
+
+Lots with no expiry date (opening stock) and reserved lots are left alone.
+
+Usage:
+    python expiry_sweeper.py [--date YYYY-MM-DD] [--db PATH]
+"""
+
+import argparse
+from datetime import date
+
+import blood_units
+import db_pool
+import inventory_ledger
+import migrations
+import stock
+
+EXPIRED_REASON = 'expired'
+SWEPT_BY = 'expiry-sweep'
+
+_GROUPS = ', '.join('?' for _ in stock.BLOOD_GROUPS)
+
+# Lots the sweep retires; params are the blood groups then the cutoff date
+EXPIRED_LOTS = f'''
+    FROM blood_units
+    WHERE blood_group IN ({_GROUPS}) AND status = 'available' AND expiry_date < ?
+'''
+
+
+class SweepReport:
+    """Counts from one sweep."""
+
+    def __init__(self):
+        self.lots_expired = 0
+        self.units_expired = 0
+        self.by_group = {}
+
+    def as_dict(self):
+        return {
+            'lots_expired': self.lots_expired,
+            'units_expired': self.units_expired,
+            'by_group': self.by_group,
+        }
+
+
+def sweep(conn, today=None):
+    """Retire every available lot that expired before today, in one transaction."""
+    params = (*stock.BLOOD_GROUPS, (today or blood_units.expiry_today()).isoformat())
+    report = SweepReport()
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        totals = conn.execute(f'''
+            SELECT blood_group, COUNT(*) AS lots, SUM(units_remaining) AS units
+            {EXPIRED_LOTS}
+            GROUP BY blood_group
+        ''', params).fetchall()
+        if not totals:
+            conn.rollback()
+            return report
+
+        conn.execute(f'''
+            INSERT INTO unit_issues (unit_id, blood_group, units, reason, issued_by)
+            SELECT id, blood_group, units_remaining, '{EXPIRED_REASON}', '{SWEPT_BY}'
+            {EXPIRED_LOTS} AND units_remaining > 0
+        ''', params)
+        conn.executemany(
+            'UPDATE inventory SET units_expired = COALESCE(units_expired, 0) + ? WHERE blood_group = ?',
+            [(row['units'], row['blood_group']) for row in totals])
+        # The blood_units triggers take the units out of units_available
+        with inventory_ledger.context(conn, EXPIRED_REASON, recorded_by=SWEPT_BY):
+            conn.execute(f"UPDATE blood_units SET status = 'expired' WHERE id IN (SELECT id {EXPIRED_LOTS})",
+                         params)
+        for row in totals:
+            stock.refresh_status(conn, row['blood_group'])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    for row in totals:
+        report.lots_expired += row['lots']
+        report.units_expired += row['units']
+        report.by_group[row['blood_group']] = row['units']
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Retire expired blood unit lots')
+    parser.add_argument('--date', type=date.fromisoformat, default=None,
+                        help='Retire lots that expired before this day (defaults to today)')
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    args = parser.parse_args()
+
+    migrations.migrate(args.db)
+
+    conn = db_pool.get_connection(args.db)
+    report = sweep(conn, args.date)
+
+    print(f"✅ Lots expired: {report.lots_expired}")
+    print(f"✅ Units expired: {report.units_expired}")
+    for group, units in sorted(report.by_group.items()):
+        print(f"   {group}: {units}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
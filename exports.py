@@ -0,0 +1,84 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are pulled from the SQLite cursor with fetchmany() and encoded a chunk
+at a time, so memory stays flat however many rows are exported. Optional
+gzip compression is applied incrementally to the same stream.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+from flask import Response, stream_with_context
+
+CHUNK_SIZE = 500
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def iter_rows(cursor, size=CHUNK_SIZE):
+    """Yield lists of rows from an executed cursor, size rows at a time."""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        yield rows
+
+
+def iter_csv(cursor, columns):
+    """Encode cursor rows as CSV, one chunk of text per fetchmany batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in iter_rows(cursor):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(tuple(row) for row in rows)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(cursor, columns):
+    """Encode cursor rows as newline-delimited JSON objects."""
+    for rows in iter_rows(cursor):
+        yield ''.join(json.dumps(dict(zip(columns, row)), default=str) + '\n' for row in rows)
+
+
+def iter_gzip(chunks):
+    """Gzip a stream of byte chunks incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_query(conn, query, params, fmt='csv', compress=False):
+    """Execute query and return a generator of encoded byte chunks."""
+    cursor = conn.execute(query, params)
+    columns = [description[0] for description in cursor.description]
+    encode = iter_csv if fmt == 'csv' else iter_ndjson
+    chunks = (text.encode('utf-8') for text in encode(cursor, columns))
+    return iter_gzip(chunks) if compress else chunks
+
+
+def export_response(conn, query, params, basename, fmt='csv', compress=False):
+    """Build a streamed download Response for query."""
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    mimetype, extension = FORMATS[fmt]
+    filename = f'{basename}.{extension}'
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    body = stream_query(conn, query, params, fmt, compress)
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,205 @@
+"""
+Demand forecasting and per-group stock thresholds.
+
+Daily issue and donation rates per blood group are exponentially weighted
+moving averages (half-life HALF_LIFE_DAYS) over a dense day-by-group
+matrix built with NumPy. Issues come from unit_issues (units discarded at
+expiry are not demand) and donations from donation_history.
+
+The rates live on the inventory rows with the last day folded into them
+(forecast_date), so a refresh only reads the days since then and decays
+the stored averages forward; the first refresh, or one after a gap longer
+than HISTORY_DAYS, starts over from the last HISTORY_DAYS days. Today is
+never folded in because it is not over yet.
+
+From the issue rate each group gets:
+    minimum_threshold   Low Stock below this: LEAD_TIME_DAYS + SAFETY_DAYS of issues
+    high_threshold      High Stock above this: HIGH_COVER_DAYS of issues
+    days_of_cover       units_available / issue rate
+Groups with no issues in the window keep the default 10 / 20 thresholds.
+stock.refresh_status() compares units_available against the stored
+thresholds, so status changes stay a single-row UPDATE.
+
+Usage:
+    python forecast.py [--db PATH] [--rebuild]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+import db_pool
+import stock
+
+HISTORY_DAYS = 90
+HALF_LIFE_DAYS = 14
+ALPHA = 1 - 0.5 ** (1 / HALF_LIFE_DAYS)
+
+LEAD_TIME_DAYS = 3
+SAFETY_DAYS = 4
+HIGH_COVER_DAYS = 21
+MIN_LOW_THRESHOLD = 2
+
+# unit_issues reasons that are not demand
+NON_DEMAND_REASONS = ('expired',)
+
+COLUMNS = [
+    ('high_threshold', f'INTEGER DEFAULT {stock.DEFAULT_HIGH_THRESHOLD}'),
+    ('issue_rate', 'REAL'),
+    ('donation_rate', 'REAL'),
+    ('days_of_cover', 'REAL'),
+    ('forecast_date', 'DATE'),
+]
+
+
+def ensure_schema(conn):
+    """Add the forecast columns to inventory."""
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(inventory)')}
+    for column, definition in COLUMNS:
+        if column not in existing:
+            conn.execute(f'ALTER TABLE inventory ADD COLUMN {column} {definition}')
+
+
+def daily_matrix(conn, start, end):
+    """
+    Units issued and donated per day and blood group for start <= day < end.
+
+    Returns (issues, donations), each a float array of shape
+    (days, len(stock.BLOOD_GROUPS)).
+    """
+    days = (end - start).days
+    group_index = {group: i for i, group in enumerate(stock.BLOOD_GROUPS)}
+    groups = ', '.join('?' for _ in stock.BLOOD_GROUPS)
+    excluded = ', '.join('?' for _ in NON_DEMAND_REASONS)
+
+    issue_rows = conn.execute(f'''
+        SELECT blood_group, DATE(issued_at) AS day, SUM(units)
+        FROM unit_issues
+        WHERE blood_group IN ({groups}) AND issued_at >= ? AND issued_at < ?
+          AND reason NOT IN ({excluded})
+        GROUP BY blood_group, day
+    ''', (*stock.BLOOD_GROUPS, start.isoformat(), end.isoformat(), *NON_DEMAND_REASONS)).fetchall()
+
+    donation_rows = conn.execute('''
+        SELECT d.blood_group, dh.donation_date AS day, SUM(dh.units_donated)
+        FROM donation_history dh
+        JOIN donors d ON d.donor_id = dh.donor_id
+        WHERE dh.donation_date >= ? AND dh.donation_date < ?
+        GROUP BY d.blood_group, dh.donation_date
+    ''', (start.isoformat(), end.isoformat())).fetchall()
+
+    matrices = []
+    for rows in (issue_rows, donation_rows):
+        matrix = np.zeros((days, len(stock.BLOOD_GROUPS)), dtype=np.float64)
+        rows = [row for row in rows if row[0] in group_index and row[1]]
+        if rows:
+            day_idx = np.array([(date.fromisoformat(row[1][:10]) - start).days for row in rows])
+            group_idx = np.array([group_index[row[0]] for row in rows])
+            np.add.at(matrix, (day_idx, group_idx), np.array([row[2] or 0 for row in rows], dtype=np.float64))
+        matrices.append(matrix)
+    return matrices[0], matrices[1]
+
+
+def fold(rates, matrix, alpha=ALPHA):
+    """
+    Advance EWMA rates (one per group) through the days of matrix.
+
+    Equivalent to rate = alpha * day + (1 - alpha) * rate applied day by
+    day, computed as one weighted sum over the rows.
+    """
+    days = matrix.shape[0]
+    if days == 0:
+        return rates
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1)
+    return (1 - alpha) ** days * rates + weights @ matrix
+
+
+def thresholds(issue_rates, had_issues):
+    """(minimum_threshold, high_threshold) arrays for the given daily issue rates."""
+    low = np.maximum(np.ceil(issue_rates * (LEAD_TIME_DAYS + SAFETY_DAYS)), MIN_LOW_THRESHOLD)
+    high = np.maximum(np.ceil(issue_rates * HIGH_COVER_DAYS), low + 1)
+    low = np.where(had_issues, low, stock.DEFAULT_LOW_THRESHOLD)
+    high = np.where(had_issues, high, stock.DEFAULT_HIGH_THRESHOLD)
+    return low.astype(int), high.astype(int)
+
+
+def refresh(conn, today=None, rebuild=False):
+    """
+    Fold the days since the last refresh into the rates, store the new
+    thresholds and refresh every group's status. Commits.
+
+    Returns {blood_group: row dict} as stored.
+    """
+    today = today or date.today()
+    end = today
+    rows = {row['blood_group']: row for row in conn.execute(
+        'SELECT blood_group, issue_rate, donation_rate, forecast_date FROM inventory')}
+
+    known = [rows[g]['forecast_date'] for g in stock.BLOOD_GROUPS if g in rows]
+    last = min((date.fromisoformat(d) for d in known if d), default=None) if all(known) else None
+    if rebuild or last is None or (end - last).days > HISTORY_DAYS:
+        # Start over: seed each rate with the window's plain mean, then smooth through it
+        start = end - timedelta(days=HISTORY_DAYS)
+        issues, donations = daily_matrix(conn, start, end)
+        issue_rates = fold(issues.mean(axis=0), issues)
+        donation_rates = fold(donations.mean(axis=0), donations)
+        had_issues = issues.sum(axis=0) > 0
+    else:
+        start = last + timedelta(days=1)
+        issues, donations = daily_matrix(conn, start, end)
+        previous = [rows.get(g) for g in stock.BLOOD_GROUPS]
+        issue_rates = fold(np.array([(r['issue_rate'] or 0.0) if r else 0.0 for r in previous]), issues)
+        donation_rates = fold(np.array([(r['donation_rate'] or 0.0) if r else 0.0 for r in previous]),
+                              donations)
+        # A rate that has decayed to nothing means no recent issues
+        had_issues = issue_rates * (LEAD_TIME_DAYS + SAFETY_DAYS) >= 0.5
+
+    low, high = thresholds(issue_rates, had_issues)
+    forecast_date = (end - timedelta(days=1)).isoformat()
+    conn.executemany('''
+        UPDATE inventory
+        SET issue_rate = ?, donation_rate = ?, minimum_threshold = ?, high_threshold = ?,
+            forecast_date = ?
+        WHERE blood_group = ?
+    ''', [(round(float(issue_rates[i]), 4), round(float(donation_rates[i]), 4), int(low[i]), int(high[i]),
+           forecast_date, group) for i, group in enumerate(stock.BLOOD_GROUPS)])
+    for group in stock.BLOOD_GROUPS:
+        stock.refresh_status(conn, group)
+    conn.commit()
+
+    return {row['blood_group']: dict(row) for row in conn.execute('''
+        SELECT blood_group, units_available, status, issue_rate, donation_rate,
+               minimum_threshold, high_threshold, days_of_cover, forecast_date
+        FROM inventory
+    ''')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh demand forecasts and stock thresholds')
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help=f'Recompute from the last {HISTORY_DAYS} days instead of folding in new days')
+    args = parser.parse_args()
+
+    # Imported here because migrations imports this module
+    import migrations
+    migrations.migrate(args.db)
+
+    conn = db_pool.get_connection(args.db)
+    rows = refresh(conn, rebuild=args.rebuild)
+    print(f"{'Group':<6}{'Units':>7}{'Issued/day':>12}{'Donated/day':>13}{'Low':>6}{'High':>6}"
+          f"{'Cover (days)':>14}  Status")
+    for group in stock.BLOOD_GROUPS:
+        row = rows.get(group)
+        if row is None:
+            continue
+        cover = row['days_of_cover']
+        cover = '-' if cover is None else f'{cover:.1f}'
+        print(f"{group:<6}{row['units_available']:>7}{row['issue_rate']:>12.2f}{row['donation_rate']:>13.2f}"
+              f"{row['minimum_threshold']:>6}{row['high_threshold']:>6}{cover:>14}  {row['status']}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,9 +1,25 @@
-bind = "0.0.0.0:10000"
-workers = 2  # Reduced for memory efficiency
-threads = 2
-timeout = 120
-keepalive = 5
-worker_class = "sync"
-worker_connections = 1000
-max_requests = 1000
-max_requests_jitter = 100
\ No newline at end of file
+import os
+import tempfile
+
+# Workers share request metrics through files here (see metrics.py)
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'hemocare_metrics'))
+
+import metrics
+
+bind = "0.0.0.0:10000"
+workers = 2  # Reduced for memory efficiency
+threads = 2
+timeout = 120
+keepalive = 5
+worker_class = "sync"
+worker_connections = 1000
+max_requests = 1000
+max_requests_jitter = 100
+
+
+def on_starting(server):
+    metrics.reset_dir()
+
+
+def child_exit(server, worker):
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,251 @@
+"""
+Incremental, resumable database health scanner.
+
+Each check walks its table in rowid chunks, probing other tables only
+through indexed keys (NOT EXISTS anti-joins on donors.donor_id and
+donation_history(donor_id, donation_date)). Every chunk is a short read
+followed by a tiny checkpoint write to ``health_checks``, so a scan never
+holds a lock for long and can stop at any point. The next run carries on
+from the checkpoint; a check's result is published once its pass reaches
+the end of the table, and the next pass starts from the beginning.
+
+Results are served on /admin/health and as gauges on /metrics.
+
+Usage:
+    python health_scanner.py [--budget SECONDS] [--chunk-size N] [--db PATH] [--reset]
+"""
+
+import argparse
+import json
+import time
+
+import blood_units
+import db_pool
+import stock
+from eligibility import DONATION_INTERVAL_DAYS
+
+CHUNK_SIZE = 5000
+SAMPLE_SIZE = 10
+
+# Seconds one run may spend before it checkpoints and stops
+DEFAULT_BUDGET = 30.0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS health_checks (
+    name TEXT PRIMARY KEY,
+    last_rowid INTEGER NOT NULL DEFAULT 0,
+    issues INTEGER NOT NULL DEFAULT 0,
+    samples TEXT,
+    pass_started_at TIMESTAMP,
+    pass_seconds REAL NOT NULL DEFAULT 0,
+    result_issues INTEGER,
+    result_samples TEXT,
+    result_completed_at TIMESTAMP,
+    result_seconds REAL
+);
+'''
+
+_BLOOD_GROUPS = ', '.join(f"'{group}'" for group in stock.BLOOD_GROUPS)
+
+# (name, description, table walked, query returning one key per problem
+# among the rows with rowid between :low and :high)
+CHECKS = [
+    ('orphaned_donations', 'Donations whose donor no longer exists', 'donation_history', '''
+        SELECT dh.donation_id FROM donation_history dh
+        WHERE dh.rowid BETWEEN :low AND :high
+          AND NOT EXISTS (SELECT 1 FROM donors d WHERE d.donor_id = dh.donor_id)
+    '''),
+    ('invalid_blood_groups', 'Donors with an invalid blood group', 'donors', f'''
+        SELECT donor_id FROM donors
+        WHERE rowid BETWEEN :low AND :high AND blood_group NOT IN ({_BLOOD_GROUPS})
+    '''),
+    ('expired_units_in_stock', 'Expired blood units still counted as available', 'blood_units', '''
+        SELECT id FROM blood_units
+        WHERE rowid BETWEEN :low AND :high AND status = 'available' AND expiry_date < :today
+    '''),
+    ('stale_next_eligible_dates', 'Eligible donors whose next eligible date is before the donation interval ends',
+     'donors', f'''
+        SELECT donor_id FROM donors
+        WHERE rowid BETWEEN :low AND :high AND eligible = 1 AND last_donation_date IS NOT NULL
+          AND COALESCE(next_eligible_date, '') < DATE(last_donation_date, '+{DONATION_INTERVAL_DAYS} days')
+    '''),
+    ('stale_last_donation_dates', 'Donors with a recorded donation later than their last donation date',
+     'donors', '''
+        SELECT d.donor_id FROM donors d
+        WHERE d.rowid BETWEEN :low AND :high
+          AND EXISTS (SELECT 1 FROM donation_history dh
+                      WHERE dh.donor_id = d.donor_id
+                        AND dh.donation_date > COALESCE(d.last_donation_date, ''))
+    '''),
+]
+
+CHECK_NAMES = {check[0] for check in CHECKS}
+
+
+def ensure_schema(conn):
+    """Create the checkpoint table."""
+    db_pool.run_script(conn, SCHEMA)
+
+
+class ScanReport:
+    """What one run did, per check."""
+
+    def __init__(self):
+        self.rows_scanned = 0
+        self.completed = []
+        self.finished = True
+
+    def as_dict(self):
+        return {
+            'rows_scanned': self.rows_scanned,
+            'completed': self.completed,
+            'finished': self.finished,
+        }
+
+
+def _state(conn, name):
+    conn.execute('INSERT OR IGNORE INTO health_checks (name) VALUES (?)', (name,))
+    return conn.execute('SELECT * FROM health_checks WHERE name = ?', (name,)).fetchone()
+
+
+def _scan_check(conn, name, table, query, deadline, chunk_size, today, report):
+    """Advance one check until its pass completes or the deadline passes."""
+    state = _state(conn, name)
+    conn.commit()
+    last_rowid, issues = state['last_rowid'], state['issues']
+    samples = json.loads(state['samples'] or '[]')
+    seconds = state['pass_seconds']
+    high_water = conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()[0] or 0
+
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            report.finished = False
+            return
+
+        started = time.monotonic()
+        low, high = last_rowid + 1, last_rowid + chunk_size
+        keys = [row[0] for row in conn.execute(query, {'low': low, 'high': high, 'today': today})]
+        issues += len(keys)
+        samples.extend(keys[:SAMPLE_SIZE - len(samples)])
+        last_rowid = high
+        seconds += time.monotonic() - started
+        report.rows_scanned += min(high, high_water) - low + 1 if low <= high_water else 0
+
+        if high < high_water:
+            conn.execute('''
+                UPDATE health_checks
+                SET last_rowid = ?, issues = ?, samples = ?, pass_seconds = ?,
+                    pass_started_at = COALESCE(pass_started_at, CURRENT_TIMESTAMP)
+                WHERE name = ?
+            ''', (last_rowid, issues, json.dumps(samples), seconds, name))
+            conn.commit()
+            continue
+
+        # End of the table: publish the result and start over next time
+        conn.execute('''
+            UPDATE health_checks
+            SET last_rowid = 0, issues = 0, samples = NULL, pass_started_at = NULL, pass_seconds = 0,
+                result_issues = ?, result_samples = ?, result_completed_at = CURRENT_TIMESTAMP,
+                result_seconds = ?
+            WHERE name = ?
+        ''', (issues, json.dumps(samples), seconds, name))
+        conn.commit()
+        report.completed.append(name)
+        return
+
+
+def scan(conn, budget=DEFAULT_BUDGET, chunk_size=CHUNK_SIZE, today=None):
+    """
+    Advance every check from its checkpoint, for at most budget seconds.
+
+    Each check finishes its current pass at most once per run. budget=None
+    runs until every check has completed a pass.
+    """
+    today = (today or blood_units.expiry_today()).isoformat()
+    deadline = None if budget is None else time.monotonic() + budget
+    report = ScanReport()
+    for name, _, table, query in CHECKS:
+        _scan_check(conn, name, table, query, deadline, chunk_size, today, report)
+        if not report.finished:
+            break
+    return report
+
+
+def reset(conn):
+    """Discard checkpoints so the next run starts every check from the beginning."""
+    conn.execute('UPDATE health_checks SET last_rowid = 0, issues = 0, samples = NULL, '
+                 'pass_started_at = NULL, pass_seconds = 0')
+    conn.commit()
+
+
+def results(conn):
+    """Last complete result and current progress of every check."""
+    rows = {row['name']: row for row in conn.execute('SELECT * FROM health_checks')}
+    checks = []
+    for name, description, table, _ in CHECKS:
+        row = rows.get(name)
+        high_water = conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()[0] or 0
+        last_rowid = row['last_rowid'] if row else 0
+        checks.append({
+            'name': name,
+            'description': description,
+            'issues': row['result_issues'] if row else None,
+            'samples': json.loads(row['result_samples'] or '[]') if row else [],
+            'completed_at': row['result_completed_at'] if row else None,
+            'seconds': round(row['result_seconds'], 3) if row and row['result_seconds'] is not None else None,
+            'progress': round(min(last_rowid / high_water, 1.0), 3) if high_water else 0.0,
+        })
+    return checks
+
+
+def gauges():
+    """metrics collector: last complete result of each check."""
+    conn = db_pool.get_connection()
+    values = []
+    for row in conn.execute('''
+        SELECT name, result_issues, CAST(strftime('%s', result_completed_at) AS INTEGER) AS completed
+        FROM health_checks WHERE result_completed_at IS NOT NULL
+    '''):
+        # Rows of checks that have since been replaced keep their last result
+        if row['name'] not in CHECK_NAMES:
+            continue
+        labels = (('check', row['name']),)
+        values.append(('hemocare_health_issues', labels, row['result_issues']))
+        values.append(('hemocare_health_completed_timestamp_seconds', labels, row['completed']))
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the incremental database health scan')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='Stop after this many seconds (default: run every check to completion)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    parser.add_argument('--reset', action='store_true', help='Start every check from the beginning')
+    args = parser.parse_args()
+
+    # Imported here because migrations imports this module
+    import migrations
+    migrations.migrate(args.db)
+
+    conn = db_pool.get_connection(args.db)
+    if args.reset:
+        reset(conn)
+    report = scan(conn, args.budget, args.chunk_size)
+
+    print(f"Rows scanned: {report.rows_scanned:,}")
+    for check in results(conn):
+        if check['issues'] is None:
+            print(f"⏳ {check['description']}: in progress ({check['progress']:.0%})")
+            continue
+        status = "⚠️ WARNING" if check['issues'] else "✅ OK"
+        print(f"{status} {check['description']}: {check['issues']} issues (as of {check['completed_at']})")
+        if check['samples']:
+            print(f"   e.g. {', '.join(map(str, check['samples']))}")
+    if not report.finished:
+        print("Scan paused at its time budget; run again to continue.")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+"""
+Sequence-backed ID allocator for donors, donations and transfusions.
+
+``id_sequences`` holds the next free number of each sequence. A worker
+process reserves a block of numbers with one short write transaction and
+then hands IDs out of that block from memory, so most allocations cost no
+database round trip and can never collide. IDs keep their readable
+prefixes (DON10042, DONATION5123, TRF000017) and increase within a worker;
+numbers left in a block when a worker exits are simply skipped.
+
+When the caller's connection is already inside a write transaction (a
+write_queue command, for example) the missing numbers are reserved in that
+transaction instead and are not cached, so a rollback cannot leave this
+process holding numbers the database has taken back.
+"""
+
+import os
+import threading
+
+import db_pool
+
+# name -> (prefix, minimum digits, table, column)
+SEQUENCES = {
+    'donor': ('DON', 5, 'donors', 'donor_id'),
+    'donation': ('DONATION', 4, 'donation_history', 'donation_id'),
+    'transfusion': ('TRF', 6, 'blood_transfusion', 'transfusion_id'),
+}
+
+BLOCK_SIZE = int(os.environ.get('ID_BLOCK_SIZE', 100))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS id_sequences (
+    name TEXT PRIMARY KEY,
+    next_value INTEGER NOT NULL
+);
+'''
+
+# Sequences start (and are kept) above the largest numeric ID already in the table
+SEED = '''
+INSERT INTO id_sequences (name, next_value)
+SELECT :name, COALESCE(MAX(CAST(SUBSTR({column}, :start) AS INTEGER)), 0) + 1
+FROM {table}
+WHERE {column} GLOB :prefix || '[0-9]*' AND SUBSTR({column}, :start) NOT GLOB '*[^0-9]*'
+ON CONFLICT(name) DO UPDATE SET next_value = MAX(next_value, excluded.next_value)
+'''
+
+
+def ensure_schema(conn):
+    """Create id_sequences and seed it from the existing IDs."""
+    db_pool.run_script(conn, SCHEMA)
+    sync(conn)
+
+
+def sync(conn):
+    """Move every sequence past the largest numeric ID already stored."""
+    for name, (prefix, _, table, column) in SEQUENCES.items():
+        conn.execute(SEED.format(table=table, column=column),
+                     {'name': name, 'prefix': prefix, 'start': len(prefix) + 1})
+
+
+class IdAllocator:
+    """Per-process cache of reserved number blocks, one per sequence."""
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._blocks = {}
+
+    def _reserve(self, conn, name, count):
+        """Take count numbers from the sequence; returns the first one."""
+        cursor = conn.execute('UPDATE id_sequences SET next_value = next_value + ? WHERE name = ?',
+                              (count, name))
+        if cursor.rowcount != 1:
+            raise KeyError(f'Unknown ID sequence: {name}')
+        return conn.execute('SELECT next_value FROM id_sequences WHERE name = ?',
+                            (name,)).fetchone()[0] - count
+
+    def numbers(self, conn, name, count=1):
+        """Allocate count sequence numbers for name."""
+        with self._lock:
+            # A forked worker must not hand out its parent's block
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._blocks = {}
+
+            start, end = self._blocks.get(name, (0, 0))
+            taken = list(range(start, min(end, start + count)))
+            self._blocks[name] = (start + len(taken), end)
+            shortfall = count - len(taken)
+            if not shortfall:
+                return taken
+
+            if conn.in_transaction:
+                first = self._reserve(conn, name, shortfall)
+                return taken + list(range(first, first + shortfall))
+
+            size = max(self.block_size, shortfall)
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                first = self._reserve(conn, name, size)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self._blocks[name] = (first + shortfall, first + size)
+            return taken + list(range(first, first + shortfall))
+
+
+_allocator = IdAllocator()
+
+
+def format_id(name, number):
+    prefix, digits = SEQUENCES[name][:2]
+    return f'{prefix}{number:0{digits}d}'
+
+
+def allocate(conn, name, count):
+    """Return count new IDs for the named sequence, in increasing order."""
+    return [format_id(name, number) for number in _allocator.numbers(conn, name, count)]
+
+
+def next_id(conn, name):
+    """Return one new ID for the named sequence."""
+    return allocate(conn, name, 1)[0]
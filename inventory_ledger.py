@@ -0,0 +1,337 @@
+"""
+Append-only inventory ledger and daily stock snapshots.
+
+``inventory`` only holds the current count, so the ledger records every
+change to it: one row per change with the delta, the group's balance
+afterwards, a reason, a reference id, the lot and who made it. The rows
+are written by the blood_units stock triggers right after they update
+inventory, in the same transaction, so every writer is covered and
+balance is exact. Updating or deleting a ledger row is refused.
+
+Reasons default to what the lot change shows (its source on insert, then
+'issue', 'reserved', 'released' or 'expired'). Writers that know more wrap
+the change in context(), which fills in the single row of
+inventory_ledger_context for the triggers and restores it before the
+transaction ends, so the committed row is always empty.
+
+Because each row carries the balance, the stock at any moment is the
+balance of the group's last row up to then, one seek on
+idx_inventory_ledger_group_time with no replay. inventory_snapshots holds
+each group's closing balance per day, taken nightly by the scheduler
+(jobs.py), so a series over a long range reads one small row per
+snapshotted day and replays only the ledger rows after the last snapshot.
+
+Times and days are UTC, like every other CURRENT_TIMESTAMP in the schema.
+
+Usage:
+    python inventory_ledger.py snapshot [--db PATH]
+    python inventory_ledger.py at MOMENT [--group GROUP] [--db PATH]
+"""
+
+import argparse
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import db_pool
+
+MAX_SERIES_DAYS = 366
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS inventory_ledger (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    blood_group TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    reference_id TEXT,
+    lot_id INTEGER,
+    recorded_by TEXT,
+    recorded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_ledger_group_time ON inventory_ledger(blood_group, recorded_at);
+
+CREATE TRIGGER IF NOT EXISTS inventory_ledger_no_update BEFORE UPDATE ON inventory_ledger BEGIN
+    SELECT RAISE(ABORT, 'inventory_ledger is append-only');
+END;
+
+CREATE TRIGGER IF NOT EXISTS inventory_ledger_no_delete BEFORE DELETE ON inventory_ledger BEGIN
+    SELECT RAISE(ABORT, 'inventory_ledger is append-only');
+END;
+
+CREATE TABLE IF NOT EXISTS inventory_ledger_context (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    reason TEXT,
+    reference_id TEXT,
+    recorded_by TEXT
+);
+
+INSERT OR IGNORE INTO inventory_ledger_context (id) VALUES (1);
+
+CREATE TABLE IF NOT EXISTS inventory_snapshots (
+    blood_group TEXT NOT NULL,
+    snapshot_date DATE NOT NULL,
+    units_available INTEGER NOT NULL,
+    ledger_id INTEGER NOT NULL,
+    PRIMARY KEY (blood_group, snapshot_date)
+) WITHOUT ROWID;
+'''
+
+# The stock carried into the ledger when it starts
+OPENING = '''
+INSERT INTO inventory_ledger (blood_group, delta, balance, reason)
+SELECT blood_group, COALESCE(units_available, 0), COALESCE(units_available, 0), 'opening'
+FROM inventory;
+'''
+
+
+def _ledger_row(groups, delta, reason, reference, lot):
+    # delta may refer to i.blood_group; rows with no change are skipped
+    return f'''INSERT INTO inventory_ledger (blood_group, delta, balance, reason, reference_id, lot_id, recorded_by)
+    SELECT i.blood_group, {delta}, i.units_available, COALESCE(c.reason, {reason}),
+           COALESCE(c.reference_id, {reference}), {lot}, c.recorded_by
+    FROM inventory i LEFT JOIN inventory_ledger_context c ON c.id = 1
+    WHERE i.blood_group IN ({groups}) AND {delta} != 0;'''
+
+
+def _available(row):
+    return f"(CASE WHEN {row}.status = 'available' AND {row}.blood_group = i.blood_group " \
+           f"THEN {row}.units_remaining ELSE 0 END)"
+
+
+# A lot update can move units between groups, so both are considered
+_UPDATE_LEDGER_ROW = _ledger_row(
+    'old.blood_group, new.blood_group',
+    f"{_available('new')} - {_available('old')}",
+    """CASE
+        WHEN new.status = 'expired' THEN 'expired'
+        WHEN new.status = 'reserved' THEN 'reserved'
+        WHEN old.status = 'reserved' THEN 'released'
+        WHEN new.units_remaining < old.units_remaining OR new.status = 'issued' THEN 'issue'
+        ELSE 'adjustment'
+    END""",
+    'COALESCE(old.reserved_for, new.reserved_for)',
+    'new.id')
+
+# The blood_units.py stock triggers with a ledger row written straight after
+# each inventory update, so balance is the count after the change
+TRIGGERS = f'''
+DROP TRIGGER IF EXISTS blood_units_stock_insert;
+DROP TRIGGER IF EXISTS blood_units_stock_delete;
+DROP TRIGGER IF EXISTS blood_units_stock_update;
+
+CREATE TRIGGER blood_units_stock_insert AFTER INSERT ON blood_units
+WHEN new.status = 'available' BEGIN
+    UPDATE inventory SET units_available = units_available + new.units_remaining,
+                         last_updated = CURRENT_TIMESTAMP
+    WHERE blood_group = new.blood_group;
+    {_ledger_row('new.blood_group', 'new.units_remaining', 'new.source', 'new.donation_id', 'new.id')}
+END;
+
+CREATE TRIGGER blood_units_stock_delete AFTER DELETE ON blood_units
+WHEN old.status = 'available' BEGIN
+    UPDATE inventory SET units_available = units_available - old.units_remaining,
+                         last_updated = CURRENT_TIMESTAMP
+    WHERE blood_group = old.blood_group;
+    {_ledger_row('old.blood_group', '-old.units_remaining', "'deleted'", 'old.donation_id', 'old.id')}
+END;
+
+CREATE TRIGGER blood_units_stock_update
+AFTER UPDATE OF units_remaining, status, blood_group ON blood_units
+WHEN old.status = 'available' OR new.status = 'available' BEGIN
+    UPDATE inventory SET units_available = units_available - old.units_remaining,
+                         last_updated = CURRENT_TIMESTAMP
+    WHERE blood_group = old.blood_group AND old.status = 'available';
+    UPDATE inventory SET units_available = units_available + new.units_remaining,
+                         last_updated = CURRENT_TIMESTAMP
+    WHERE blood_group = new.blood_group AND new.status = 'available';
+    {_UPDATE_LEDGER_ROW}
+END;
+'''
+
+SET_CONTEXT = 'UPDATE inventory_ledger_context SET reason = ?, reference_id = ?, recorded_by = ? WHERE id = 1'
+
+
+def ensure_schema(conn):
+    """Create the ledger and snapshot tables and add ledger rows to the stock triggers."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'inventory_ledger'"
+    ).fetchone()
+    # Opening balances and the triggers must appear together, or changes in between are lost
+    script = SCHEMA + TRIGGERS if exists else SCHEMA + OPENING + TRIGGERS
+    db_pool.run_script(conn, script)
+
+
+@contextmanager
+def context(conn, reason=None, reference_id=None, recorded_by=None):
+    """
+    Attribute the ledger rows written inside the block.
+
+    Runs in the caller's transaction. Fields left as None keep the
+    enclosing context's value, or else what the triggers derive.
+    """
+    row = conn.execute('SELECT reason, reference_id, recorded_by FROM inventory_ledger_context WHERE id = 1'
+                       ).fetchone()
+    outer = tuple(row) if row else (None, None, None)
+    conn.execute(SET_CONTEXT, tuple(value if value is not None else previous
+                                    for value, previous in zip((reason, reference_id, recorded_by), outer)))
+    try:
+        yield
+    finally:
+        conn.execute(SET_CONTEXT, outer)
+
+
+def _last_row(conn, blood_group, before):
+    """The group's last ledger row recorded before the given time, or None."""
+    return conn.execute('''
+        SELECT id, balance FROM inventory_ledger
+        WHERE blood_group = ? AND recorded_at < ?
+        ORDER BY recorded_at DESC, id DESC
+        LIMIT 1
+    ''', (blood_group, before)).fetchone()
+
+
+def _groups(conn, groups=None):
+    return list(groups) if groups else [row[0] for row in conn.execute(
+        'SELECT blood_group FROM inventory ORDER BY blood_group')]
+
+
+def stock_at(conn, moment, groups=None):
+    """
+    {blood_group: units available at moment} (a UTC datetime).
+
+    Groups whose ledger starts after moment read as None.
+    """
+    before = (moment + timedelta(seconds=1)).strftime(TIME_FORMAT)
+    stock = {}
+    for group in _groups(conn, groups):
+        row = _last_row(conn, group, before)
+        stock[group] = row['balance'] if row else None
+    return stock
+
+
+def series(conn, start, end, groups=None):
+    """
+    {blood_group: [{'date', 'units_available'}, ...]} with each day's
+    closing stock from start to end inclusive.
+
+    Days up to a group's last snapshot in the range are read from
+    inventory_snapshots. Only the days after it are replayed from the
+    ledger, in one ordered scan from that snapshot's balance; today's value
+    is the stock so far.
+    """
+    if (end - start).days >= MAX_SERIES_DAYS:
+        raise ValueError(f'A series covers at most {MAX_SERIES_DAYS} days')
+    groups = _groups(conn, groups)
+    end = min(end, datetime.utcnow().date())
+
+    snapshots = {group: {} for group in groups}
+    if end >= start:
+        rows = conn.execute(f'''
+            SELECT blood_group, snapshot_date, units_available FROM inventory_snapshots
+            WHERE blood_group IN ({', '.join('?' for _ in groups)}) AND snapshot_date BETWEEN ? AND ?
+        ''', (*groups, start.isoformat(), end.isoformat())).fetchall()
+        for row in rows:
+            snapshots[row[0]][row[1]] = row[2]
+
+    result = {}
+    for group in groups:
+        points = []
+        day = start
+        # Snapshotted days; the rare day missing among them gets its own seek
+        last_snapshot = max(snapshots[group], default=None)
+        while last_snapshot and day.isoformat() <= last_snapshot:
+            units = snapshots[group].get(day.isoformat())
+            if units is None:
+                row = _last_row(conn, group, (day + timedelta(days=1)).isoformat())
+                units = row['balance'] if row else None
+            points.append({'date': day.isoformat(), 'units_available': units})
+            day += timedelta(days=1)
+
+        if day <= end:
+            # The tail: the last closing balance, then one ordered scan to end
+            if points:
+                balance = points[-1]['units_available']
+            else:
+                row = _last_row(conn, group, day.isoformat())
+                balance = row['balance'] if row else None
+            rows = conn.execute('''
+                SELECT recorded_at, balance FROM inventory_ledger
+                WHERE blood_group = ? AND recorded_at >= ? AND recorded_at < ?
+                ORDER BY recorded_at, id
+            ''', (group, day.isoformat(), (end + timedelta(days=1)).isoformat()))
+            row = next(rows, None)
+            while day <= end:
+                next_day = (day + timedelta(days=1)).isoformat()
+                while row is not None and row['recorded_at'] < next_day:
+                    balance = row['balance']
+                    row = next(rows, None)
+                points.append({'date': day.isoformat(), 'units_available': balance})
+                day += timedelta(days=1)
+            rows.close()
+        result[group] = points
+    return result
+
+
+def snapshot(conn, through=None):
+    """
+    Store each group's closing stock for every day up to through (UTC
+    yesterday by default) that has none yet. Commits.
+
+    Returns how many snapshots were taken.
+    """
+    through = through or datetime.utcnow().date() - timedelta(days=1)
+    rows = []
+    for group in _groups(conn):
+        last = conn.execute('SELECT MAX(snapshot_date) FROM inventory_snapshots WHERE blood_group = ?',
+                            (group,)).fetchone()[0]
+        if last:
+            day = date.fromisoformat(last) + timedelta(days=1)
+        else:
+            first = conn.execute('SELECT MIN(recorded_at) FROM inventory_ledger WHERE blood_group = ?',
+                                 (group,)).fetchone()[0]
+            if first is None:
+                continue
+            day = date.fromisoformat(first[:10])
+        while day <= through:
+            row = _last_row(conn, group, (day + timedelta(days=1)).isoformat())
+            rows.append((group, day.isoformat(), row['balance'], row['id']))
+            day += timedelta(days=1)
+
+    # Taken twice at once, the second copy is ignored
+    conn.executemany('''
+        INSERT OR IGNORE INTO inventory_snapshots (blood_group, snapshot_date, units_available, ledger_id)
+        VALUES (?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inventory ledger snapshots and point-in-time stock')
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('snapshot', help='Store closing stock for every day up to yesterday')
+    at_parser = subparsers.add_parser('at', help='Show stock at a UTC moment')
+    at_parser.add_argument('moment', type=datetime.fromisoformat, help='YYYY-MM-DD[ HH:MM:SS]')
+    at_parser.add_argument('--group', action='append', help='Blood group (repeatable; defaults to all)')
+    args = parser.parse_args()
+
+    # Imported here because migrations imports this module
+    import migrations
+    migrations.migrate(args.db)
+
+    conn = db_pool.get_connection(args.db)
+    if args.command == 'snapshot':
+        print(f"✅ Snapshots taken: {snapshot(conn)}")
+        return 0
+
+    for group, units in stock_at(conn, args.moment, args.group).items():
+        print(f"{group:<6}{'-' if units is None else units:>7}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""
+The maintenance jobs the scheduler runs.
+
+    job                    schedule          what it does
+    ledger_snapshot        00:10             inventory_ledger.snapshot (UTC days)
+    expiry_sweep           hourly at :05     expiry_sweeper.sweep
+    health_scan            every 10 minutes  health_scanner.scan within HEALTH_SCAN_BUDGET
+    backup                 01:00             backup.snapshot
+    eligibility_recompute  02:30             eligibility_job.recompute
+    forecast_refresh       02:45             forecast.refresh
+    rollup_rebuild         Sundays 03:15     rollups.rebuild, in case of drift
+    job_history_prune      04:40             drop job_runs older than JOB_HISTORY_DAYS
+    metrics_flush          every minute      metrics.flush, in every process
+
+Every job except metrics_flush runs on the scheduler leader only, so once
+per schedule across all workers (see scheduler.py).
+
+Usage:
+    python jobs.py list [--db PATH]
+    python jobs.py run JOB [--db PATH]
+"""
+
+import argparse
+import os
+
+import backup
+import db_pool
+import eligibility_job
+import expiry_sweeper
+import forecast
+import health_scanner
+import inventory_ledger
+import metrics
+import rollups
+import scheduler
+
+HEALTH_SCAN_BUDGET = float(os.environ.get('HEALTH_SCAN_BUDGET', 60))
+JOB_HISTORY_DAYS = int(os.environ.get('JOB_HISTORY_DAYS', 30))
+
+
+def _with_connection(func, **kwargs):
+    return lambda: func(db_pool.get_connection(), **kwargs)
+
+
+JOBS = [
+    # (name, cron schedule, function, jitter seconds, max runtime seconds, leader only)
+    ('ledger_snapshot', '10 0 * * *', _with_connection(inventory_ledger.snapshot), 300, 600, True),
+    ('expiry_sweep', '5 * * * *', _with_connection(expiry_sweeper.sweep), 60, 600, True),
+    ('health_scan', '*/10 * * * *', _with_connection(health_scanner.scan, budget=HEALTH_SCAN_BUDGET),
+     30, 300, True),
+    ('backup', '0 1 * * *', backup.snapshot, 300, 3600, True),
+    ('eligibility_recompute', '30 2 * * *', _with_connection(eligibility_job.recompute), 300, 3600, True),
+    ('forecast_refresh', '45 2 * * *', _with_connection(forecast.refresh), 300, 600, True),
+    ('rollup_rebuild', '15 3 * * 0', _with_connection(rollups.rebuild), 300, 3600, True),
+    ('job_history_prune', '40 4 * * *', _with_connection(scheduler.prune_history, keep_days=JOB_HISTORY_DAYS),
+     300, 600, True),
+    ('metrics_flush', '* * * * *', metrics.flush, 0, 60, False),
+]
+
+
+def install():
+    """Register every job on the process-wide scheduler."""
+    for name, schedule, func, jitter, max_runtime, leader_only in JOBS:
+        scheduler.register(name, schedule, func, jitter, max_runtime, leader_only)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List or run scheduled maintenance jobs')
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='Show each job with its schedule and last run')
+    run_parser = subparsers.add_parser('run', help='Run one job now and record it')
+    run_parser.add_argument('job', choices=[job[0] for job in JOBS])
+    args = parser.parse_args()
+
+    # Imported here because migrations imports the job modules
+    import migrations
+    migrations.migrate(args.db)
+    if args.db:
+        db_pool.DB_PATH = args.db
+    install()
+    conn = db_pool.get_connection()
+
+    if args.command == 'list':
+        print(f"Leader: {scheduler.leader(conn) or '-'}")
+        for name, job in scheduler.jobs().items():
+            last = conn.execute('''
+                SELECT status, started_at, duration_seconds FROM job_runs
+                WHERE job = ? ORDER BY started_at DESC LIMIT 1
+            ''', (name,)).fetchone()
+            summary = f"{last['status']} at {last['started_at']} ({last['duration_seconds'] or 0:.1f}s)" \
+                if last else 'never run'
+            print(f"{name:<22}{job.schedule.expression:<16}{summary}")
+        return 0
+
+    run = scheduler.run_now(scheduler.jobs()[args.job], db_pool.DB_PATH)
+    if run['status'] != 'ok':
+        print(f"❌ {args.job} {run['status']}: {run['error']}")
+        return 1
+    print(f"✅ {args.job} finished in {run['duration_seconds']:.1f}s")
+    if run['result']:
+        print(f"   {run['result']}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,296 @@
+"""
+ABO/Rh compatibility-aware matching of blood requests to stock.
+
+Pending requests are served in priority order (urgency, then required
+date). Each request takes units from compatible donor groups, exact
+match first and then the groups that can serve the fewest other patients,
+so universal O- stock is kept back for those who need it. Within a group,
+units are taken soonest-expiring first. A whole batch is planned in memory
+and written back in the caller's transaction: lots are consumed, one
+blood_transfusion row is written per lot used, and requests are marked
+fulfilled (or left approved if only part of the request could be met).
+"""
+
+from collections import deque
+from datetime import datetime
+
+import blood_units
+import db_pool
+import id_allocator
+import stock
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS blood_requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    request_id VARCHAR(15) UNIQUE NOT NULL,
+    patient_name TEXT NOT NULL,
+    hospital_name TEXT NOT NULL,
+    hospital_address TEXT,
+    doctor_name TEXT,
+    blood_group TEXT NOT NULL,
+    units_required INTEGER NOT NULL CHECK(units_required > 0),
+    urgency TEXT DEFAULT 'Normal' CHECK(urgency IN ('Emergency', 'Urgent', 'Normal')),
+    request_date DATE NOT NULL,
+    required_date DATE NOT NULL,
+    request_status TEXT DEFAULT 'Pending' CHECK(request_status IN ('Pending', 'Approved', 'Rejected', 'Fulfilled', 'Cancelled')),
+    fulfilled_units INTEGER DEFAULT 0,
+    fulfilled_date DATE,
+    requested_by INTEGER,
+    approved_by INTEGER,
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (requested_by) REFERENCES users(id),
+    FOREIGN KEY (approved_by) REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS blood_transfusion (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transfusion_id VARCHAR(15) UNIQUE NOT NULL,
+    request_id VARCHAR(15) NOT NULL,
+    donation_id VARCHAR(15) NOT NULL,
+    units_used INTEGER NOT NULL,
+    transfused_date DATE NOT NULL,
+    transfused_by INTEGER NOT NULL,
+    patient_outcome TEXT,
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (request_id) REFERENCES blood_requests(request_id),
+    FOREIGN KEY (donation_id) REFERENCES donation_history(donation_id),
+    FOREIGN KEY (transfused_by) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_blood_requests_status ON blood_requests(request_status);
+CREATE INDEX IF NOT EXISTS idx_blood_requests_blood_group ON blood_requests(blood_group);
+CREATE INDEX IF NOT EXISTS idx_blood_transfusion_request_id ON blood_transfusion(request_id);
+'''
+
+# Lots from opening stock or manual additions have no donation, so a
+# transfusion records its lot in unit_id and donation_id only when there is
+# one. Rows written as 'LOT<n>' before this are moved over to unit_id.
+TRANSFUSION_UNITS = '''
+CREATE TABLE blood_transfusion_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    transfusion_id VARCHAR(15) UNIQUE NOT NULL,
+    request_id VARCHAR(15) NOT NULL,
+    donation_id VARCHAR(15),
+    unit_id INTEGER,
+    units_used INTEGER NOT NULL,
+    transfused_date DATE NOT NULL,
+    transfused_by INTEGER NOT NULL,
+    patient_outcome TEXT,
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (request_id) REFERENCES blood_requests(request_id),
+    FOREIGN KEY (donation_id) REFERENCES donation_history(donation_id),
+    FOREIGN KEY (unit_id) REFERENCES blood_units(id),
+    FOREIGN KEY (transfused_by) REFERENCES users(id)
+);
+
+INSERT INTO blood_transfusion_new (id, transfusion_id, request_id, donation_id, unit_id, units_used,
+                                   transfused_date, transfused_by, patient_outcome, notes, created_at)
+SELECT t.id, t.transfusion_id, t.request_id,
+       CASE WHEN dh.donation_id IS NULL THEN NULL ELSE t.donation_id END,
+       CASE WHEN dh.donation_id IS NULL AND t.donation_id GLOB 'LOT[0-9]*'
+            THEN CAST(SUBSTR(t.donation_id, 4) AS INTEGER)
+            ELSE (SELECT MIN(u.id) FROM blood_units u WHERE u.donation_id = t.donation_id) END,
+       t.units_used, t.transfused_date, t.transfused_by, t.patient_outcome, t.notes, t.created_at
+FROM blood_transfusion t
+LEFT JOIN donation_history dh ON dh.donation_id = t.donation_id;
+
+DROP TABLE blood_transfusion;
+ALTER TABLE blood_transfusion_new RENAME TO blood_transfusion;
+CREATE INDEX IF NOT EXISTS idx_blood_transfusion_request_id ON blood_transfusion(request_id);
+'''
+
+GROUP_BIT = {group: 1 << i for i, group in enumerate(stock.BLOOD_GROUPS)}
+
+# Red cell compatibility: the donor groups each recipient group can receive
+_RECEIVES = {
+    'O-': ('O-',),
+    'O+': ('O+', 'O-'),
+    'A-': ('A-', 'O-'),
+    'A+': ('A+', 'A-', 'O+', 'O-'),
+    'B-': ('B-', 'O-'),
+    'B+': ('B+', 'B-', 'O+', 'O-'),
+    'AB-': ('AB-', 'A-', 'B-', 'O-'),
+    'AB+': tuple(stock.BLOOD_GROUPS),
+}
+
+# recipient group -> bitmask of compatible donor groups
+COMPATIBLE_DONORS = {
+    recipient: sum(GROUP_BIT[donor] for donor in donors)
+    for recipient, donors in _RECEIVES.items()
+}
+
+# donor group -> number of recipient groups it can serve
+_DONOR_REACH = {
+    donor: sum(1 for mask in COMPATIBLE_DONORS.values() if mask & GROUP_BIT[donor])
+    for donor in stock.BLOOD_GROUPS
+}
+
+# recipient group -> donor groups in the order they should be drawn from:
+# exact match first, then the least universally useful groups
+DONOR_PREFERENCE = {
+    recipient: [recipient] + sorted(
+        (donor for donor in stock.BLOOD_GROUPS
+         if donor != recipient and COMPATIBLE_DONORS[recipient] & GROUP_BIT[donor]),
+        key=lambda donor: (_DONOR_REACH[donor], stock.BLOOD_GROUPS.index(donor)))
+    for recipient in stock.BLOOD_GROUPS
+}
+
+URGENCY_RANK = {'Emergency': 0, 'Urgent': 1, 'Normal': 2}
+
+
+def ensure_schema(conn):
+    """Create the request and transfusion tables if they are missing."""
+    db_pool.run_script(conn, SCHEMA)
+
+
+def ensure_transfusion_units(conn):
+    """Make blood_transfusion.donation_id nullable and add unit_id, with a table rebuild."""
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(blood_transfusion)')]
+    if 'unit_id' not in columns:
+        db_pool.run_script(conn, TRANSFUSION_UNITS)
+
+
+def is_compatible(donor_group, recipient_group):
+    """Whether red cells of donor_group can be given to recipient_group."""
+    return bool(COMPATIBLE_DONORS.get(recipient_group, 0) & GROUP_BIT.get(donor_group, 0))
+
+
+def pending_requests(conn, request_ids=None):
+    """Open requests with units still outstanding, highest priority first."""
+    query = '''
+        SELECT request_id, blood_group, units_required, COALESCE(fulfilled_units, 0) AS fulfilled_units,
+               urgency, required_date
+        FROM blood_requests
+        WHERE request_status IN ('Pending', 'Approved')
+          AND COALESCE(fulfilled_units, 0) < units_required
+    '''
+    params = []
+    if request_ids:
+        query += f" AND request_id IN ({', '.join('?' for _ in request_ids)})"
+        params.extend(request_ids)
+
+    rows = conn.execute(query, params).fetchall()
+    return sorted(rows, key=lambda r: (URGENCY_RANK.get(r['urgency'], len(URGENCY_RANK)),
+                                       r['required_date'] or '', r['request_id']))
+
+
+def _load_lots(conn, blood_group, units_wanted):
+    """Allocatable lots of one group, soonest expiry first, enough to cover units_wanted."""
+    lots = deque()
+    if units_wanted <= 0:
+        return lots
+    cursor = conn.execute('''
+        SELECT id, donation_id, units_remaining, expiry_date
+        FROM blood_units
+        WHERE blood_group = ? AND status = 'available'
+          AND (expiry_date IS NULL OR expiry_date >= ?)
+        ORDER BY expiry_date
+    ''', (blood_group, blood_units.expiry_today().isoformat()))
+    total = 0
+    for row in cursor:
+        lots.append({'id': row['id'], 'donation_id': row['donation_id'],
+                     'units_remaining': row['units_remaining'], 'expiry_date': row['expiry_date']})
+        total += row['units_remaining']
+        if total >= units_wanted:
+            break
+    cursor.close()
+    return lots
+
+
+def plan_matches(conn, requests):
+    """
+    Greedily allocate stock to requests in the given (priority) order.
+
+    Returns a list of (request_row, [(donor_group, lot, units), ...]).
+    """
+    # The most any donor group could be asked for is the demand of every
+    # request it can serve
+    demand = dict.fromkeys(stock.BLOOD_GROUPS, 0)
+    for req in requests:
+        outstanding = req['units_required'] - req['fulfilled_units']
+        for donor in DONOR_PREFERENCE.get(req['blood_group'], ()):
+            demand[donor] += outstanding
+    pools = {group: _load_lots(conn, group, units) for group, units in demand.items()}
+
+    plans = []
+    for req in requests:
+        needed = req['units_required'] - req['fulfilled_units']
+        allocations = []
+        for donor in DONOR_PREFERENCE.get(req['blood_group'], ()):
+            pool = pools[donor]
+            while needed and pool:
+                lot = pool[0]
+                take = min(needed, lot['units_remaining'])
+                allocations.append((donor, lot, take))
+                lot['units_remaining'] -= take
+                needed -= take
+                if lot['units_remaining'] == 0:
+                    pool.popleft()
+            if not needed:
+                break
+        plans.append((req, allocations))
+    return plans
+
+
+def match_requests(conn, transfused_by, request_ids=None, issued_by=None):
+    """
+    Match pending requests to stock and record the transfusions.
+
+    Runs in the caller's transaction (use write_queue). transfused_by is
+    the user id stored on each transfusion; issued_by is the user name
+    recorded on the unit issues, as every other issue records it. Returns
+    one summary dict per request considered.
+    """
+    requests = pending_requests(conn, request_ids)
+    plans = plan_matches(conn, requests)
+    today = datetime.today().strftime('%Y-%m-%d')
+
+    transfusions = []
+    request_updates = []
+    touched = set()
+    results = []
+
+    for req, allocations in plans:
+        allocated = 0
+        for donor, lot, take in allocations:
+            blood_units.consume(conn, donor, [(lot, take)], reason='transfusion',
+                                reference_id=req['request_id'], issued_by=issued_by)
+            transfusions.append((
+                req['request_id'], lot['donation_id'], lot['id'], take, today, transfused_by,
+            ))
+            allocated += take
+            touched.add(donor)
+
+        fulfilled = req['fulfilled_units'] + allocated
+        complete = fulfilled >= req['units_required']
+        if allocated:
+            request_updates.append((fulfilled, 'Fulfilled' if complete else 'Approved',
+                                    today if complete else None, req['request_id']))
+        results.append({
+            'request_id': req['request_id'],
+            'blood_group': req['blood_group'],
+            'urgency': req['urgency'],
+            'units_allocated': allocated,
+            'units_outstanding': req['units_required'] - fulfilled,
+            'donor_groups': sorted({donor for donor, _, _ in allocations}),
+            'status': 'Fulfilled' if complete else ('Partial' if allocated else 'Unmatched'),
+        })
+
+    transfusion_ids = id_allocator.allocate(conn, 'transfusion', len(transfusions))
+    conn.executemany('''
+        INSERT INTO blood_transfusion (transfusion_id, request_id, donation_id, unit_id, units_used,
+                                       transfused_date, transfused_by)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(transfusion_id,) + row for transfusion_id, row in zip(transfusion_ids, transfusions)])
+    conn.executemany('''
+        UPDATE blood_requests
+        SET fulfilled_units = ?, request_status = ?, fulfilled_date = COALESCE(?, fulfilled_date)
+        WHERE request_id = ?
+    ''', request_updates)
+    for group in touched:
+        stock.refresh_status(conn, group)
+
+    return results
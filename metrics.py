@@ -0,0 +1,315 @@
+"""
+Per-request instrumentation exposed in Prometheus text format on /metrics.
+
+For every request the route (Flask endpoint) gets its latency, the number
+of SQL statements it ran, the time they spent inside SQLite, the rows they
+fetched and the time spent rendering templates. SQL figures come from the
+pooled connections' cursors (see db_pool.observers); statements run
+outside a request, such as the write_queue thread's, are counted under the
+thread name instead of a route.
+
+Each process keeps its figures in memory. With METRICS_DIR set (the
+gunicorn config sets it) every worker also writes them to its own file
+there, at most every FLUSH_SECONDS and when it exits, and /metrics sums
+the files of all workers. When a worker dies the master folds its file
+into archive.json so the totals never go backwards.
+
+Gauges are not accumulated: the functions in collectors are called when
+/metrics is scraped and report the current value of each one.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from flask import before_render_template, request, template_rendered
+
+import db_pool
+
+METRICS_DIR = os.environ.get('METRICS_DIR')
+FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+
+ARCHIVE_FILE = 'archive.json'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds (seconds) of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help text)
+METRICS = {
+    'hemocare_requests_total': ('counter', 'Requests served, by route, method and status.'),
+    'hemocare_request_duration_seconds': ('histogram', 'Request latency by route.'),
+    'hemocare_sql_duration_seconds': ('histogram', 'Time spent in SQLite per request, by route.'),
+    'hemocare_template_duration_seconds': ('histogram', 'Template render time per request, by route.'),
+    'hemocare_sql_statements_total': ('counter', 'SQL statements executed, by route.'),
+    'hemocare_sql_seconds_total': ('counter', 'Time spent in SQLite, by route.'),
+    'hemocare_sql_rows_total': ('counter', 'Rows fetched from SQLite, by route.'),
+    'hemocare_health_issues': ('gauge', 'Problems found by the last complete health scan, by check.'),
+    'hemocare_health_completed_timestamp_seconds':
+        ('gauge', 'Unix time the last complete health scan of each check finished.'),
+}
+
+# Called at scrape time; each returns [(metric name, label pairs, value)]
+collectors = []
+
+logger = logging.getLogger(__name__)
+
+
+class Registry:
+    """Counters and histograms keyed by (metric name, label pairs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # One count per bucket plus +Inf, then sum
+                histogram = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(LATENCY_BUCKETS)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        """A JSON-serialisable copy of every value."""
+        with self._lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, list(values)]
+                               for (name, labels), values in self.histograms.items()],
+            }
+
+    def merge(self, snapshot):
+        """Add the values of a snapshot to this registry."""
+        with self._lock:
+            for name, labels, value in snapshot.get('counters', ()):
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, labels, values in snapshot.get('histograms', ()):
+                key = (name, tuple(map(tuple, labels)))
+                current = self.histograms.get(key)
+                self.histograms[key] = values if current is None else [a + b for a, b in zip(current, values)]
+
+
+class RequestStats:
+    """Figures collected while one request is being handled."""
+
+    __slots__ = ('started', 'statements', 'sql_seconds', 'rows', 'template_seconds', 'template_started')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.template_seconds = 0.0
+        self.template_started = None
+
+
+_registry = Registry()
+_local = threading.local()
+_last_flush = 0.0
+# Request threads, /metrics, atexit and the scheduler all flush
+_flush_lock = threading.Lock()
+
+
+def _worker_file(pid=None):
+    return os.path.join(METRICS_DIR, f'worker_{pid or os.getpid()}.json')
+
+
+def _write_json(path, data):
+    # A unique name per write, so concurrent writers never share a temp file
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(path), suffix='.tmp', delete=False) as f:
+        json.dump(data, f)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def flush():
+    """Write this worker's figures to its file in METRICS_DIR."""
+    global _last_flush
+    if not METRICS_DIR:
+        return
+    with _flush_lock:
+        _last_flush = time.monotonic()
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        _write_json(_worker_file(), _registry.snapshot())
+
+
+def mark_process_dead(pid):
+    """Fold a dead worker's file into the archive (gunicorn child_exit hook)."""
+    if not METRICS_DIR:
+        return
+    path = _worker_file(pid)
+    if not os.path.exists(path):
+        return
+    archive = Registry()
+    archive.merge(_read_json(os.path.join(METRICS_DIR, ARCHIVE_FILE)))
+    archive.merge(_read_json(path))
+    _write_json(os.path.join(METRICS_DIR, ARCHIVE_FILE), archive.snapshot())
+    os.remove(path)
+
+
+def reset_dir():
+    """Remove files left by a previous run (gunicorn on_starting hook)."""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+        os.remove(path)
+
+
+def collect():
+    """Every worker's figures summed into one Registry."""
+    if not METRICS_DIR:
+        return _registry
+    flush()
+    total = Registry()
+    total.merge(_read_json(os.path.join(METRICS_DIR, ARCHIVE_FILE)))
+    for path in glob.glob(os.path.join(METRICS_DIR, 'worker_*.json')):
+        total.merge(_read_json(path))
+    return total
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def _gauges():
+    values = []
+    for collector in collectors:
+        try:
+            values.extend(collector())
+        except Exception:
+            # A failing collector must not take the rest of /metrics down
+            continue
+    return values
+
+
+def render(registry=None):
+    """The registry and the collectors' gauges in Prometheus text exposition format."""
+    registry = registry or collect()
+    gauges = _gauges()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'gauge':
+            for metric, labels, value in sorted(gauges, key=lambda gauge: gauge[:2]):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+            continue
+        if kind == 'counter':
+            for (metric, labels), value in sorted(registry.counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+            continue
+        for (metric, labels), values in sorted(registry.histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {values[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def _observe_statement(db_path, sql, params, seconds, rows):
+    stats = getattr(_local, 'request', None)
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += seconds
+        stats.rows += rows
+        return
+    labels = (('route', threading.current_thread().name),)
+    _registry.inc('hemocare_sql_statements_total', labels)
+    _registry.inc('hemocare_sql_seconds_total', labels, seconds)
+    _registry.inc('hemocare_sql_rows_total', labels, rows)
+
+
+def _before_request():
+    _local.request = RequestStats()
+
+
+def _after_request(response):
+    stats = getattr(_local, 'request', None)
+    _local.request = None
+    if stats is None:
+        return response
+
+    route = (('route', request.endpoint or 'unmatched'),)
+    _registry.inc('hemocare_requests_total',
+                  route + (('method', request.method), ('status', str(response.status_code))))
+    _registry.observe('hemocare_request_duration_seconds', route, time.perf_counter() - stats.started)
+    _registry.observe('hemocare_sql_duration_seconds', route, stats.sql_seconds)
+    _registry.observe('hemocare_template_duration_seconds', route, stats.template_seconds)
+    _registry.inc('hemocare_sql_statements_total', route, stats.statements)
+    _registry.inc('hemocare_sql_seconds_total', route, stats.sql_seconds)
+    _registry.inc('hemocare_sql_rows_total', route, stats.rows)
+
+    if METRICS_DIR and time.monotonic() - _last_flush >= FLUSH_SECONDS:
+        try:
+            flush()
+        except OSError as e:
+            # Figures stay in memory for the next flush; the request is unaffected
+            logger.warning('Flushing metrics failed: %s', e)
+    return response
+
+
+def _template_started(sender, template, context, **extra):
+    stats = getattr(_local, 'request', None)
+    if stats is not None:
+        stats.template_started = time.perf_counter()
+
+
+def _template_finished(sender, template, context, **extra):
+    stats = getattr(_local, 'request', None)
+    if stats is not None and stats.template_started is not None:
+        stats.template_seconds += time.perf_counter() - stats.template_started
+        stats.template_started = None
+
+
+def init_app(app):
+    """Record the figures above for every request the app serves."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    if _observe_statement not in db_pool.observers:
+        db_pool.observers.append(_observe_statement)
+    atexit.register(flush)
@@ -0,0 +1,315 @@
+"""
+Versioned schema migrations.
+
+Every schema change is a numbered migration. Each one runs in its own
+BEGIN IMMEDIATE transaction together with its ``schema_version`` row and
+the matching ``PRAGMA user_version`` bump, so it applies completely or not
+at all. Gunicorn workers that boot together queue up on the write lock
+and skip what another worker has already applied.
+
+Once a database is current, migrate() costs a single PRAGMA user_version
+read, so app.py can call it on every worker boot.
+
+The app, database.py and database_setup.py all bootstrap through here.
+Databases created by any of them before migrations existed have
+user_version 0. Every migration is written to be safe on those, creating
+only what is missing.
+
+Add new changes as a new entry at the end of MIGRATIONS; never edit one
+that has shipped.
+
+Usage:
+    python migrations.py [--db PATH]
+"""
+
+import argparse
+import hashlib
+import random
+import sqlite3
+
+import blood_units
+import counters
+import db_pool
+import donation_history
+import donor_ranking
+import donor_search
+import eligibility_job
+import forecast
+import health_scanner
+import id_allocator
+import inventory_ledger
+import matching
+import pagination
+import rollups
+import scheduler
+import stock
+
+# How long a booting worker waits for another one's migration to finish
+LOCK_TIMEOUT_MS = 60000
+
+SCHEMA_VERSION_TABLE = '''
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+'''
+
+BASE_TABLES = '''
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    name TEXT NOT NULL,
+    role TEXT DEFAULT 'staff',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS donors (
+    donor_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    date_of_birth DATE NOT NULL,
+    age INTEGER,
+    gender TEXT NOT NULL,
+    blood_group TEXT NOT NULL,
+    city TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    email TEXT,
+    medical_details TEXT,
+    eligible BOOLEAN DEFAULT 1,
+    last_donation_date DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS inventory (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    blood_group TEXT UNIQUE NOT NULL,
+    units_available INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'Normal',
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS donation_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    donation_id TEXT UNIQUE NOT NULL,
+    donor_id TEXT NOT NULL,
+    units_donated INTEGER NOT NULL,
+    donation_date DATE NOT NULL,
+    expiry_date DATE,
+    received_by TEXT,
+    test_result TEXT DEFAULT 'Passed',
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+'''
+
+# Columns database_setup.py's schema has that the app's tables lacked.
+# ADD COLUMN cannot take a non-constant default such as CURRENT_TIMESTAMP,
+# so updated_at is backfilled from created_at instead.
+SETUP_COLUMNS = {
+    'users': [
+        ('last_login', 'TIMESTAMP'),
+        ('is_active', 'BOOLEAN DEFAULT 1'),
+    ],
+    'donors': [
+        ('weight', 'DECIMAL(5,2)'),
+        ('height', 'DECIMAL(5,2)'),
+        ('status', "TEXT DEFAULT 'Active'"),
+        ('created_by', 'INTEGER'),
+        ('updated_at', 'TIMESTAMP'),
+    ],
+    'inventory': [
+        ('units_used', 'INTEGER DEFAULT 0'),
+        ('units_expired', 'INTEGER DEFAULT 0'),
+        ('minimum_threshold', 'INTEGER DEFAULT 10'),
+        ('maximum_capacity', 'INTEGER DEFAULT 50'),
+        ('location', "TEXT DEFAULT 'Main Storage'"),
+        ('expiry_date', 'DATE'),
+        ('notes', 'TEXT'),
+    ],
+    'donation_history': [
+        ('hemoglobin_level', 'DECIMAL(4,2)'),
+        ('blood_pressure', 'VARCHAR(10)'),
+        ('donation_type', "TEXT DEFAULT 'Whole Blood'"),
+        ('tested_by', 'INTEGER'),
+    ],
+}
+
+AUDIT_LOG = '''
+CREATE TABLE IF NOT EXISTS audit_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    action TEXT NOT NULL CHECK(action IN ('INSERT', 'UPDATE', 'DELETE')),
+    old_values TEXT,
+    new_values TEXT,
+    changed_by INTEGER,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ip_address TEXT,
+    user_agent TEXT,
+    FOREIGN KEY (changed_by) REFERENCES users(id)
+);
+'''
+
+# database_setup.py's indexes and views. idx_inventory_blood_group and
+# idx_donation_history_donation_date are left out: the UNIQUE constraint on
+# inventory.blood_group and idx_donation_history_date_id already cover them.
+SETUP_INDEXES_AND_VIEWS = '''
+CREATE INDEX IF NOT EXISTS idx_donors_city ON donors(city);
+CREATE INDEX IF NOT EXISTS idx_donors_eligible ON donors(eligible);
+CREATE INDEX IF NOT EXISTS idx_inventory_status ON inventory(status);
+
+CREATE VIEW IF NOT EXISTS donor_statistics AS
+SELECT
+    d.blood_group,
+    COUNT(*) as total_donors,
+    SUM(CASE WHEN d.eligible = 1 THEN 1 ELSE 0 END) as eligible_donors,
+    SUM(CASE WHEN d.gender = 'Male' THEN 1 ELSE 0 END) as male_donors,
+    SUM(CASE WHEN d.gender = 'Female' THEN 1 ELSE 0 END) as female_donors,
+    AVG(d.age) as avg_age,
+    MIN(d.age) as min_age,
+    MAX(d.age) as max_age
+FROM donors d
+GROUP BY d.blood_group;
+
+CREATE VIEW IF NOT EXISTS critical_inventory AS
+SELECT
+    blood_group,
+    units_available,
+    minimum_threshold,
+    status,
+    last_updated
+FROM inventory
+WHERE status IN ('Critical', 'Low Stock')
+ORDER BY units_available ASC;
+''' + donation_history.DEPENDENT_VIEWS['monthly_donation_summary']
+
+
+# Indexes for plans query_audit.py flags: the 7-day expiry window on the
+# dashboard and /inventory, and /donors (and DatabaseManager.search_donors)
+# filtered by blood group in name order
+QUERY_AUDIT_INDEXES = '''
+CREATE INDEX IF NOT EXISTS idx_donation_history_expiry_date ON donation_history(expiry_date);
+CREATE INDEX IF NOT EXISTS idx_donors_blood_group_name ON donors(blood_group, name, donor_id);
+'''
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def _base_tables(conn):
+    db_pool.run_script(conn, BASE_TABLES)
+
+    if conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0:
+        conn.executemany('INSERT INTO users (email, password, name, role) VALUES (?, ?, ?, ?)', [
+            ('admin@bloodbank.com', hash_password('admin123'), 'System Administrator', 'admin'),
+            ('staff@bloodbank.com', hash_password('staff123'), 'John Doe', 'staff'),
+        ])
+        print("Default users created")
+
+    if conn.execute('SELECT COUNT(*) FROM inventory').fetchone()[0] == 0:
+        for bg in stock.BLOOD_GROUPS:
+            units = random.randint(5, 25)
+            status = stock.status_for(units)
+            conn.execute('INSERT INTO inventory (blood_group, units_available, status) VALUES (?, ?, ?)',
+                         (bg, units, status))
+        print("Inventory initialized")
+
+
+def _setup_columns(conn):
+    for table, columns in SETUP_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        for column, definition in columns:
+            if column not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    conn.execute('UPDATE donors SET updated_at = created_at WHERE updated_at IS NULL')
+    db_pool.run_script(conn, AUDIT_LOG)
+
+
+def _setup_indexes_and_views(conn):
+    db_pool.run_script(conn, SETUP_INDEXES_AND_VIEWS)
+
+
+def _query_audit_indexes(conn):
+    db_pool.run_script(conn, QUERY_AUDIT_INDEXES)
+
+
+MIGRATIONS = [
+    (1, 'base tables and default data', _base_tables),
+    (2, 'database_setup columns and audit_log', _setup_columns),
+    (3, 'normalize donation_history', donation_history.ensure_schema),
+    (4, 'donor search index', donor_search.ensure_schema),
+    (5, 'statistics counters', counters.ensure_schema),
+    (6, 'blood unit lots', blood_units.ensure_schema),
+    (7, 'blood requests and transfusions', matching.ensure_schema),
+    (8, 'id sequences', id_allocator.ensure_schema),
+    (9, 'donor ranking version', donor_ranking.ensure_schema),
+    (10, 'next eligible date', eligibility_job.ensure_schema),
+    (11, 'pagination indexes', pagination.ensure_schema),
+    (12, 'database_setup indexes and views', _setup_indexes_and_views),
+    (13, 'expiry date and blood group name indexes', _query_audit_indexes),
+    (14, 'health scan checkpoints', health_scanner.ensure_schema),
+    (15, 'monthly and donor rollups', rollups.ensure_schema),
+    (16, 'stock forecast columns', forecast.ensure_schema),
+    (17, 'scheduler lease and job runs', scheduler.ensure_schema),
+    (18, 'inventory ledger and snapshots', inventory_ledger.ensure_schema),
+    (19, 'donor ranking versions per blood group', donor_ranking.ensure_group_versions),
+    (20, 'transfusion lots and nullable donation_id', matching.ensure_transfusion_units),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(db_path=None):
+    """Apply any pending migrations and return how many were applied."""
+    conn = sqlite3.connect(db_path or db_pool.DB_PATH, isolation_level=None)
+    try:
+        if current_version(conn) >= LATEST_VERSION:
+            return 0
+
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA busy_timeout = {LOCK_TIMEOUT_MS}')
+        conn.execute(SCHEMA_VERSION_TABLE)
+
+        applied = 0
+        for version, name, apply in MIGRATIONS:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another worker may have got here first
+                if current_version(conn) >= version:
+                    conn.execute('ROLLBACK')
+                    continue
+                apply(conn)
+                conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            applied += 1
+            print(f"Applied migration {version}: {name}")
+        return applied
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply pending schema migrations')
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    args = parser.parse_args()
+
+    applied = migrate(args.db)
+    if applied:
+        print(f"✅ Applied {applied} migration(s); schema is at version {LATEST_VERSION}")
+    else:
+        print(f"✅ Schema is up to date (version {LATEST_VERSION})")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination helpers for the list pages.
+
+Pages are addressed by an opaque cursor holding the sort key of the last
+(or first) row shown, so every page is a single index range scan no matter
+how deep into the table it is.
+"""
+
+import base64
+import binascii
+import json
+
+import db_pool
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Composite indexes matching the ORDER BY of each paginated page
+INDEXES = '''
+CREATE INDEX IF NOT EXISTS idx_donors_name_donor_id ON donors(name, donor_id);
+CREATE INDEX IF NOT EXISTS idx_donation_history_date_id ON donation_history(donation_date, id);
+'''
+
+
+def ensure_schema(conn):
+    """Create the indexes the paginated queries rely on."""
+    db_pool.run_script(conn, INDEXES)
+
+
+def page_size(args):
+    """Read ?per_page= from the request args, clamped to MAX_PAGE_SIZE."""
+    try:
+        size = int(args.get('per_page', DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    """Pack sort key values into a URL-safe token."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a cursor token, returning None if it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def fetch_page(conn, query, params, order_by, key, size, after=None, before=None, descending=False):
+    """
+    Run a keyset-paginated query.
+
+    query is a SELECT ending in a WHERE clause (``WHERE 1=1`` is fine);
+    order_by lists the SQL sort columns and key the matching row keys used
+    to build cursors. Returns (rows, next_cursor, prev_cursor).
+    """
+    after_values = decode_cursor(after)
+    before_values = decode_cursor(before)
+    if after_values is not None and len(after_values) != len(order_by):
+        after_values = None
+    if before_values is not None and len(before_values) != len(order_by):
+        before_values = None
+
+    columns = ', '.join(order_by)
+    placeholders = ', '.join('?' for _ in order_by)
+    backwards = before_values is not None and after_values is None
+    params = list(params)
+
+    if after_values is not None:
+        query += f' AND ({columns}) {"<" if descending else ">"} ({placeholders})'
+        params.extend(after_values)
+    elif backwards:
+        query += f' AND ({columns}) {">" if descending else "<"} ({placeholders})'
+        params.extend(before_values)
+
+    # Walking backwards flips the sort, and the page is reversed afterwards
+    direction = 'DESC' if descending != backwards else 'ASC'
+    query += ' ORDER BY ' + ', '.join(f'{column} {direction}' for column in order_by)
+    query += ' LIMIT ?'
+    params.append(size + 1)
+
+    rows = conn.execute(query, params).fetchall()
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor(row[k] for k in key)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = cursor_for(rows[-1])
+        if (has_more and backwards) or after_values is not None:
+            prev_cursor = cursor_for(rows[0])
+    return rows, next_cursor, prev_cursor
@@ -0,0 +1,275 @@
+"""
+Query-plan audit for the SQL the app issues.
+
+Seeds a throwaway database through the normal bulk import path, drives
+every registered route (and the DatabaseManager helpers) while recording
+each statement run on the pooled connection, and runs EXPLAIN QUERY PLAN
+on every distinct query shape. A plan that scans a whole table (or walks
+a whole index without a LIMIT to stop it) or sorts an ORDER BY in a temp
+B-tree is reported, and the command exits non-zero, so a missing or
+unusable index is caught before it reaches production.
+
+Queries that only touch the small fixed-size tables in SMALL_TABLES are
+not flagged. A scenario may also list the findings it accepts, 'scan' or
+'sort', with the reason next to it. New routes and queries belong in
+ROUTES or MANAGER_CALLS.
+
+Usage:
+    python query_audit.py [--donors N] [--donations N] [--keep PATH]
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import tempfile
+from datetime import date, timedelta
+
+import bulk_import
+import db_pool
+import migrations
+import pagination
+import scheduler
+import stock
+from slow_queries import fingerprint
+
+DEFAULT_DONORS = 5000
+DEFAULT_DONATIONS = 20000
+
+# Tables with one row per blood group, counter or rollup key, and the
+# schema catalog; scanning them is cheap
+SMALL_TABLES = {'inventory', 'stats_counters', 'id_sequences', 'sqlite_master',
+                'monthly_donation_rollup', 'donor_stats_rollup'}
+
+# (name, method, path, form data, accepted findings). Paths are filled in
+# from sample values taken from the seeded database.
+ROUTES = [
+    ('dashboard', 'GET', '/dashboard', None, ()),
+    ('inventory', 'GET', '/inventory', None, ()),
+    ('donors', 'GET', '/donors', None, ()),
+    ('donors next page', 'GET', '/donors?after={donors_cursor}', None, ()),
+    ('donors previous page', 'GET', '/donors?before={donors_cursor}', None, ()),
+    ('donors by blood group', 'GET', '/donors?blood_group=O-', None, ()),
+    # Full-text matches come back in rowid order and are sorted afterwards
+    ('donors search', 'GET', '/donors?search={name_part}', None, ('sort',)),
+    ('donors by city', 'GET', '/donors?city={city}', None, ()),
+    ('donor detail', 'GET', '/donor/{donor_id}', None, ()),
+    ('donor info', 'GET', '/donor_info/{donor_id}', None, ()),
+    ('history', 'GET', '/history', None, ()),
+    ('history next page', 'GET', '/history?after={history_cursor}', None, ()),
+    # Substring match on donor_id; the LIMIT stops the walk once a page is found
+    ('history by donor', 'GET', '/history?donor_id={donor_id}', None, ()),
+    ('history by blood group', 'GET', '/history?blood_group=O-', None, ()),
+    # Every eligible donor is listed, so the sort is over the result itself
+    ('search blood', 'POST', '/search_blood', {'blood_group': 'O-'}, ('sort',)),
+    ('search blood by city', 'POST', '/search_blood', {'blood_group': 'O-', 'city': '{city}'}, ('sort',)),
+    ('ranked search', 'POST', '/search_blood', {'blood_group': 'O-', 'ranked': 'yes'}, ()),
+    # Exports read every row by design
+    ('export history', 'GET', '/export/history', None, ('scan',)),
+    ('export donors', 'GET', '/export/donors', None, ('scan',)),
+    ('stock at', 'GET', '/api/stock_at?at={month_start}', None, ()),
+    ('stock series', 'GET', '/api/stock_series?start={month_start}&end={month_end}', None, ()),
+]
+
+# (name, call, accepted findings) for the DatabaseManager helpers
+MANAGER_CALLS = [
+    ('DatabaseManager.search_donors', lambda db, s: db.search_donors(blood_group='O-'), ()),
+    ('DatabaseManager.get_inventory_status', lambda db, s: db.get_inventory_status(), ()),
+    ('DatabaseManager.get_donation_history',
+     lambda db, s: db.get_donation_history(donor_id=s['donor_id']), ()),
+    ('DatabaseManager.get_donation_history by date',
+     lambda db, s: db.get_donation_history(start_date=s['month_start'], end_date=s['month_end']), ()),
+    ('DatabaseManager.get_statistics', lambda db, s: db.get_statistics(), ()),
+]
+
+AUDITED_STATEMENTS = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+_TABLE_ACCESS = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS \w+)?( USING .*)?$')
+_TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR .*ORDER BY')
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+_FIRST_NAMES = ['Aarav', 'Priya', 'Rahul', 'Ananya', 'Vikram', 'Meera', 'Arjun', 'Kavya',
+                'Rohan', 'Divya', 'Karthik', 'Sneha', 'Aditya', 'Lakshmi', 'Suresh', 'Nisha']
+_LAST_NAMES = ['Sharma', 'Iyer', 'Reddy', 'Nair', 'Patel', 'Kumar', 'Singh', 'Menon',
+               'Rao', 'Das', 'Gupta', 'Pillai']
+_CITIES = ['Chennai', 'Coimbatore', 'Madurai', 'Bangalore', 'Hyderabad', 'Mumbai', 'Pune',
+           'Delhi', 'Kolkata', 'Trichy']
+
+
+def seed(db_path, donors=DEFAULT_DONORS, donations=DEFAULT_DONATIONS, rng=None):
+    """Create a database at db_path and fill it through bulk_import."""
+    rng = rng or random.Random(0)
+    migrations.migrate(db_path)
+    conn = db_pool.get_connection(db_path)
+    today = date.today()
+
+    def donation_date():
+        return (today - timedelta(days=rng.randint(0, 730))).isoformat()
+
+    donor_rows = ((line, {
+        'name': f'{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}',
+        'dob': (today - timedelta(days=rng.randint(19 * 365, 64 * 365))).isoformat(),
+        'gender': rng.choice(bulk_import.GENDERS[:2]),
+        'blood_group': rng.choice(stock.BLOOD_GROUPS),
+        'city': rng.choice(_CITIES),
+        'phone': f'9{rng.randint(0, 999999999):09d}',
+        'units_donated': '1',
+        'donation_date': donation_date(),
+    }) for line in range(donors))
+    bulk_import.import_rows(conn, donor_rows, 'Query Audit')
+
+    donor_ids = [row[0] for row in conn.execute('SELECT donor_id FROM donors')]
+    repeat_rows = ((line, {
+        'donor_id': rng.choice(donor_ids),
+        'units_donated': str(rng.randint(1, 2)),
+        'donation_date': donation_date(),
+    }) for line in range(max(donations - donors, 0)))
+    bulk_import.import_rows(conn, repeat_rows, 'Query Audit')
+
+    conn.execute('ANALYZE')
+    conn.commit()
+    return conn
+
+
+def sample_values(conn):
+    """Values to fill the ROUTES paths with, taken from the seeded data."""
+    total = conn.execute('SELECT COUNT(*) FROM donors').fetchone()[0]
+    donor = conn.execute('SELECT donor_id, name, city FROM donors ORDER BY name, donor_id LIMIT 1 OFFSET ?',
+                         (total // 2,)).fetchone()
+    donation = conn.execute('SELECT id, donation_date FROM donation_history ORDER BY donation_date, id '
+                            'LIMIT 1 OFFSET ?',
+                            (conn.execute('SELECT COUNT(*) FROM donation_history').fetchone()[0] // 2,)
+                            ).fetchone()
+    month_start = date.fromisoformat(donation['donation_date']).replace(day=1)
+    return {
+        'donor_id': donor['donor_id'],
+        'name_part': donor['name'][:4],
+        'city': donor['city'],
+        'donors_cursor': pagination.encode_cursor([donor['name'], donor['donor_id']]),
+        'history_cursor': pagination.encode_cursor([donation['donation_date'], donation['id']]),
+        'month_start': month_start.isoformat(),
+        'month_end': (month_start + timedelta(days=31)).replace(day=1).isoformat(),
+    }
+
+
+def record_statements(db_path, sample):
+    """Run every scenario and return {scenario name: ([statements], accepted findings)}."""
+    # Imported here: importing app migrates whatever db_pool.DB_PATH points at
+    db_pool.DB_PATH = db_path
+    # Keep scheduled jobs from running against the audit copy
+    scheduler.ENABLED = False
+    from app import app
+    from database_setup import DatabaseManager
+
+    conn = db_pool.get_connection(db_path)
+    recorded = {}
+    current = []
+    conn.set_trace_callback(lambda sql: current.append(sql))
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['user_name'] = 'Query Audit'
+        session['user_role'] = 'admin'
+
+    try:
+        for name, method, path, form, accepted in ROUTES:
+            current.clear()
+            data = {key: value.format(**sample) for key, value in (form or {}).items()}
+            response = client.open(path.format(**sample), method=method, data=data)
+            response.get_data()
+            if response.status_code != 200:
+                raise RuntimeError(f'{name}: {method} {path} returned {response.status_code}')
+            recorded[name] = (list(current), accepted)
+
+        manager = DatabaseManager(db_path)
+        for name, call, accepted in MANAGER_CALLS:
+            current.clear()
+            call(manager, sample)
+            recorded[name] = (list(current), accepted)
+    finally:
+        conn.set_trace_callback(None)
+    return recorded
+
+
+def plan_findings(sql, plan, accepted=()):
+    """Problems in the EXPLAIN QUERY PLAN result for sql, as a list of strings."""
+    accesses = [match.groups() for match in (_TABLE_ACCESS.match(row[3]) for row in plan) if match]
+    if all(table in SMALL_TABLES for _, table, _ in accesses):
+        return []
+
+    findings = []
+    for row in plan:
+        detail = row[3]
+        access = _TABLE_ACCESS.match(detail)
+        if access and access.group(1) == 'SCAN' and access.group(2) not in SMALL_TABLES \
+                and 'scan' not in accepted:
+            # An index walk is fine when it is in ORDER BY order and a LIMIT ends it
+            if not access.group(3):
+                findings.append(f'full table scan: {detail}')
+            elif 'VIRTUAL TABLE' not in detail and not _LIMIT.search(sql):
+                findings.append(f'full index scan: {detail}')
+        if _TEMP_SORT.search(detail) and 'sort' not in accepted:
+            findings.append(f'temp B-tree sort: {detail}')
+    return findings
+
+
+def audit(conn, recorded):
+    """EXPLAIN each distinct statement; returns [(scenario, sql, plan, findings)]."""
+    results = []
+    seen = set()
+    for name, (statements, accepted) in recorded.items():
+        for sql in statements:
+            sql = sql.strip()
+            # Trigger bodies are traced as comments
+            if not sql.upper().startswith(AUDITED_STATEMENTS):
+                continue
+            shape = fingerprint(sql)
+            if shape in seen:
+                continue
+            seen.add(shape)
+            plan = conn.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+            results.append((name, shape, plan, plan_findings(sql, plan, accepted)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN every query shape the app issues')
+    parser.add_argument('--donors', type=int, default=DEFAULT_DONORS)
+    parser.add_argument('--donations', type=int, default=DEFAULT_DONATIONS)
+    parser.add_argument('--keep', default=None, help='Keep the seeded database at this path')
+    parser.add_argument('--verbose', action='store_true', help='Print every plan, not just flagged ones')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='query_audit_')
+    db_path = os.path.join(workdir, 'audit.db')
+    try:
+        print(f"Seeding {args.donors} donors and {args.donations} donations...")
+        conn = seed(db_path, args.donors, args.donations)
+        recorded = record_statements(db_path, sample_values(conn))
+        results = audit(conn, recorded)
+
+        flagged = 0
+        for name, shape, plan, findings in results:
+            if findings:
+                flagged += 1
+            if findings or args.verbose:
+                print(f"\n{'❌' if findings else '✅'} {name}\n   {shape}")
+                for row in plan:
+                    print(f"   | {row[3]}")
+                for finding in findings:
+                    print(f"   -> {finding}")
+
+        print(f"\n{len(results)} query shapes checked, {flagged} flagged")
+        db_pool.close_all()
+        if args.keep:
+            shutil.copy(db_path, args.keep)
+        return 1 if flagged else 0
+    finally:
+        db_pool.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,218 @@
+"""
+Trigger-maintained rollup tables behind the monthly and donor reports.
+
+``monthly_donation_rollup`` holds passed donations and units per (month,
+donor blood group) and ``donor_stats_rollup`` holds donors and eligible
+donors per (blood group, gender, age). Triggers on donation_history and
+donors keep both exact as rows change, the same way counters.py keeps
+stats_counters, so monthly_donation_summary, donor_statistics and
+DatabaseManager.get_statistics() read a few hundred rows whatever the
+size of the history.
+
+Ages are kept in one-year steps so minimum and maximum ages stay exact
+when donors are deleted; donor_statistics_by_age_band groups them into
+AGE_BANDS. Donors without a recorded age are stored with age -1.
+
+Usage:
+    python rollups.py [--db PATH]     # rebuild both rollups from the base tables
+"""
+
+import argparse
+
+import db_pool
+
+# (label, lowest age, highest age)
+AGE_BANDS = [
+    ('18-24', 18, 24),
+    ('25-34', 25, 34),
+    ('35-44', 35, 44),
+    ('45-54', 45, 54),
+    ('55-65', 55, 65),
+]
+
+_MONTH = "strftime('%Y-%m', {row}donation_date)"
+
+_MONTHLY_UPSERT = ('ON CONFLICT(month, blood_group) DO UPDATE SET '
+                   'donations = donations + excluded.donations, units = units + excluded.units;')
+
+
+def _donation_changes(row, sign):
+    # Donations carry no blood group of their own; it is the donor's
+    month = _MONTH.format(row=f'{row}.')
+    return (f"INSERT INTO monthly_donation_rollup (month, blood_group, donations, units) "
+            f"SELECT {month}, blood_group, {sign}1, {sign}{row}.units_donated FROM donors "
+            f"WHERE donor_id = {row}.donor_id AND {row}.test_result = 'Passed' AND {month} IS NOT NULL "
+            f"{_MONTHLY_UPSERT}")
+
+
+def _donor_donations(row, sign):
+    month = _MONTH.format(row='')
+    return (f"INSERT INTO monthly_donation_rollup (month, blood_group, donations, units) "
+            f"SELECT {month}, {row}.blood_group, {sign}COUNT(*), {sign}SUM(units_donated) "
+            f"FROM donation_history WHERE donor_id = {row}.donor_id AND test_result = 'Passed' "
+            f"AND {month} IS NOT NULL GROUP BY {month} "
+            f"{_MONTHLY_UPSERT}")
+
+
+def _donor_changes(row, sign):
+    return (f"INSERT INTO donor_stats_rollup (blood_group, gender, age, donors, eligible_donors) "
+            f"VALUES ({row}.blood_group, {row}.gender, COALESCE({row}.age, -1), {sign}1, "
+            f"{sign}({row}.eligible = 1)) "
+            f"ON CONFLICT(blood_group, gender, age) DO UPDATE SET "
+            f"donors = donors + excluded.donors, eligible_donors = eligible_donors + excluded.eligible_donors;")
+
+
+_AGE_BAND = 'CASE ' + ' '.join(
+    f"WHEN age BETWEEN {low} AND {high} THEN '{label}'" for label, low, high in AGE_BANDS
+) + " WHEN age < 0 THEN 'unknown' ELSE 'other' END"
+
+_KNOWN_AGE = 'age >= 0 AND donors > 0'
+
+VIEWS = f'''
+DROP VIEW IF EXISTS monthly_donation_summary;
+CREATE VIEW monthly_donation_summary AS
+SELECT
+    month,
+    blood_group,
+    donations as total_donations,
+    units as total_units,
+    units * 1.0 / donations as avg_units_per_donation
+FROM monthly_donation_rollup
+WHERE donations > 0;
+
+DROP VIEW IF EXISTS donor_statistics;
+CREATE VIEW donor_statistics AS
+SELECT
+    blood_group,
+    SUM(donors) as total_donors,
+    SUM(eligible_donors) as eligible_donors,
+    SUM(CASE WHEN gender = 'Male' THEN donors ELSE 0 END) as male_donors,
+    SUM(CASE WHEN gender = 'Female' THEN donors ELSE 0 END) as female_donors,
+    SUM(CASE WHEN {_KNOWN_AGE} THEN age * donors END) * 1.0
+        / SUM(CASE WHEN {_KNOWN_AGE} THEN donors END) as avg_age,
+    MIN(CASE WHEN {_KNOWN_AGE} THEN age END) as min_age,
+    MAX(CASE WHEN {_KNOWN_AGE} THEN age END) as max_age
+FROM donor_stats_rollup
+GROUP BY blood_group
+HAVING SUM(donors) > 0;
+
+DROP VIEW IF EXISTS donor_statistics_by_age_band;
+CREATE VIEW donor_statistics_by_age_band AS
+SELECT
+    blood_group,
+    gender,
+    {_AGE_BAND} as age_band,
+    SUM(donors) as total_donors,
+    SUM(eligible_donors) as eligible_donors
+FROM donor_stats_rollup
+WHERE donors > 0
+GROUP BY blood_group, gender, age_band;
+'''
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS monthly_donation_rollup (
+    month TEXT NOT NULL,
+    blood_group TEXT NOT NULL,
+    donations INTEGER NOT NULL DEFAULT 0,
+    units INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, blood_group)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS donor_stats_rollup (
+    blood_group TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    donors INTEGER NOT NULL DEFAULT 0,
+    eligible_donors INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (blood_group, gender, age)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS rollup_donations_insert AFTER INSERT ON donation_history BEGIN
+    {_donation_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_donations_delete AFTER DELETE ON donation_history BEGIN
+    {_donation_changes('old', '-')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_donations_update
+AFTER UPDATE OF units_donated, test_result, donor_id, donation_date ON donation_history BEGIN
+    {_donation_changes('old', '-')}
+    {_donation_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_donors_insert AFTER INSERT ON donors BEGIN
+    {_donor_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_donors_delete AFTER DELETE ON donors BEGIN
+    {_donor_changes('old', '-')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_donors_update
+AFTER UPDATE OF blood_group, gender, age, eligible ON donors BEGIN
+    {_donor_changes('old', '-')}
+    {_donor_changes('new', '+')}
+END;
+
+CREATE TRIGGER IF NOT EXISTS rollup_donors_regroup AFTER UPDATE OF blood_group ON donors
+WHEN old.blood_group IS NOT new.blood_group BEGIN
+    {_donor_donations('old', '-')}
+    {_donor_donations('new', '+')}
+END;
+''' + VIEWS
+
+REBUILD = f'''
+DELETE FROM monthly_donation_rollup;
+
+INSERT INTO monthly_donation_rollup (month, blood_group, donations, units)
+SELECT {_MONTH.format(row='dh.')}, d.blood_group, COUNT(*), SUM(dh.units_donated)
+FROM donation_history dh JOIN donors d ON d.donor_id = dh.donor_id
+WHERE dh.test_result = 'Passed' AND {_MONTH.format(row='dh.')} IS NOT NULL
+GROUP BY 1, 2;
+
+DELETE FROM donor_stats_rollup;
+
+INSERT INTO donor_stats_rollup (blood_group, gender, age, donors, eligible_donors)
+SELECT blood_group, gender, COALESCE(age, -1), COUNT(*), SUM(eligible = 1)
+FROM donors
+GROUP BY 1, 2, 3;
+'''
+
+
+def ensure_schema(conn):
+    """Create the rollup tables, triggers and views, backfilling on first run."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'monthly_donation_rollup'"
+    ).fetchone()
+    # Triggers and the backfill must appear together, or writes in between are lost
+    script = SCHEMA if exists else SCHEMA + REBUILD
+    db_pool.run_script(conn, script)
+
+
+def rebuild(conn):
+    """Recompute both rollups from the base tables."""
+    conn.executescript('BEGIN IMMEDIATE;' + REBUILD + 'COMMIT;')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the monthly and donor rollups')
+    parser.add_argument('--db', default=None, help='Database path (defaults to DATABASE_PATH)')
+    args = parser.parse_args()
+
+    # Imported here because migrations imports this module
+    import migrations
+    migrations.migrate(args.db)
+
+    conn = db_pool.get_connection(args.db)
+    rebuild(conn)
+    months, groups = conn.execute(
+        'SELECT COUNT(DISTINCT month), COUNT(DISTINCT blood_group) FROM monthly_donation_rollup'
+    ).fetchone()
+    donors = conn.execute('SELECT COALESCE(SUM(donors), 0) FROM donor_stats_rollup').fetchone()[0]
+    print(f"✅ Rollups rebuilt: {months} months x {groups} blood groups, {donors:,} donors")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,386 @@
+"""
+In-process scheduler for recurring maintenance jobs.
+
+Every process serving the app (each gunicorn worker, or the dev server)
+runs a scheduler thread, but only one of them, the leader, runs jobs.
+The leader holds the 'scheduler' row in scheduler_leases and renews it
+every TICK_SECONDS with a conditional upsert, so taking over is atomic.
+If the leader exits it releases the lease; if it dies or hangs the lease
+runs out after LEASE_SECONDS and another process takes over. Either way
+each job runs once per schedule, not once per worker. Jobs registered
+with leader_only=False, such as flushing this process's metrics, run in
+every process instead and are not recorded.
+
+Schedules are five-field cron expressions (minute hour day month weekday,
+in local time) with *, lists, ranges and steps. A job starts up to jitter
+seconds after its scheduled minute, and a new leader catches up on a run
+that was missed while nobody held the lease. Jobs never overlap
+themselves. A job is skipped while its previous run is still going,
+whether in this process or, according to job_runs, in another. A run
+still going after max_runtime is marked 'timeout'.
+
+Each run happens on its own thread with its own pooled connection, off
+the request path, and is recorded in job_runs with its status, duration
+and result (see /admin/jobs and jobs.py).
+
+Set SCHEDULER_ENABLED=0 to keep a process out of the election.
+"""
+
+import atexit
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import db_pool
+
+ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') == '1'
+TICK_SECONDS = float(os.environ.get('SCHEDULER_TICK_SECONDS', 5))
+LEASE_SECONDS = float(os.environ.get('SCHEDULER_LEASE_SECONDS', 30))
+DEFAULT_MAX_RUNTIME = 3600
+
+LEASE_NAME = 'scheduler'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    status TEXT NOT NULL CHECK(status IN ('running', 'ok', 'failed', 'timeout', 'abandoned')),
+    holder TEXT,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    duration_seconds REAL,
+    result TEXT,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_started ON job_runs(job, started_at);
+'''
+
+logger = logging.getLogger(__name__)
+
+# (name, lowest, highest) of each cron field
+CRON_FIELDS = (('minute', 0, 59), ('hour', 0, 23), ('day', 1, 31), ('month', 1, 12), ('weekday', 0, 6))
+
+
+def ensure_schema(conn):
+    """Create the lease and job history tables."""
+    db_pool.run_script(conn, SCHEMA)
+
+
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = map(int, part.split('-'))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(f'Invalid cron field {field!r}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """A five-field cron expression; weekday 0 is Sunday."""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(f'Expected {len(CRON_FIELDS)} cron fields: {expression!r}')
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(field, low, high) for field, (_, low, high) in zip(fields, CRON_FIELDS))
+        # As in cron, a restricted day and weekday match when either does
+        self.either_day = fields[2] != '*' and fields[4] != '*'
+
+    def _day_matches(self, moment):
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        return in_days or in_weekdays if self.either_day else in_days and in_weekdays
+
+    def next_after(self, moment):
+        """The first matching minute strictly after moment."""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=5 * 366)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f'{self.expression!r} never matches')
+
+
+class Job:
+    """A registered job and the state of its latest run in this process."""
+
+    def __init__(self, name, schedule, func, jitter=0, max_runtime=DEFAULT_MAX_RUNTIME, leader_only=True):
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.func = func
+        self.jitter = jitter
+        self.max_runtime = max_runtime
+        self.leader_only = leader_only
+        self.next_run = None
+        self.thread = None
+        self.run_id = None
+        self.started = None
+        self.timed_out = False
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def plan(self, after):
+        """Set next_run to the first scheduled minute after after, plus jitter."""
+        self.next_run = self.schedule.next_after(after) + timedelta(seconds=random.uniform(0, self.jitter))
+
+
+def _result_json(result):
+    if hasattr(result, 'as_dict'):
+        result = result.as_dict()
+    return None if result is None else json.dumps(result, default=str)
+
+
+class Scheduler:
+    """Lease-elected scheduler thread, one per process."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self.jobs = {}
+        self.holder = None
+        self.is_leader = False
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def register(self, name, schedule, func, jitter=0, max_runtime=DEFAULT_MAX_RUNTIME, leader_only=True):
+        """Add a job; func takes no arguments and may return something to record."""
+        self.jobs[name] = Job(name, schedule, func, jitter, max_runtime, leader_only)
+        return self.jobs[name]
+
+    def start(self):
+        """Start this process's scheduler thread if it is not running."""
+        # Threads do not survive fork, so each gunicorn worker starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self.holder = f'{socket.gethostname()}:{self._pid}'
+                self.is_leader = False
+                for job in self.jobs.values():
+                    job.next_run = job.thread = job.run_id = None
+                self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+                self._thread.start()
+
+    def release(self):
+        """Give up the lease so another process can take over at once (atexit)."""
+        if self._pid != os.getpid() or not self.is_leader:
+            return
+        try:
+            conn = db_pool.get_connection(self.db_path)
+            conn.execute('UPDATE scheduler_leases SET expires_at = 0 WHERE name = ? AND holder = ?',
+                         (LEASE_NAME, self.holder))
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _run(self):
+        conn = db_pool.get_connection(self.db_path)
+        while True:
+            try:
+                self._tick(conn, datetime.now())
+            except sqlite3.Error as e:
+                conn.rollback()
+                logger.warning('Scheduler tick failed: %s', e)
+            time.sleep(TICK_SECONDS)
+
+    def _hold_lease(self, conn):
+        now = time.time()
+        conn.execute('''
+            INSERT INTO scheduler_leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE scheduler_leases.holder = excluded.holder OR scheduler_leases.expires_at < ?
+        ''', (LEASE_NAME, self.holder, now + LEASE_SECONDS, now))
+        conn.commit()
+        holder = conn.execute('SELECT holder FROM scheduler_leases WHERE name = ?', (LEASE_NAME,)).fetchone()
+        return holder is not None and holder[0] == self.holder
+
+    def _tick(self, conn, now):
+        leader = self._hold_lease(conn)
+        if leader != self.is_leader:
+            logger.info('%s %s the scheduler lease', self.holder, 'acquired' if leader else 'lost')
+            for job in self.jobs.values():
+                if job.leader_only:
+                    job.next_run = None
+        self.is_leader = leader
+
+        for job in self.jobs.values():
+            self._check_runtime(conn, job)
+            if job.leader_only and not leader:
+                continue
+            if job.next_run is None:
+                self._first_plan(conn, job, now)
+            if now < job.next_run:
+                continue
+            job.plan(now)
+            if job.running() or (job.leader_only and self._running_elsewhere(conn, job, now)):
+                logger.info('Skipping %s: the previous run has not finished', job.name)
+                continue
+            self._launch(conn, job, now)
+
+    def _first_plan(self, conn, job, now):
+        last = None
+        if job.leader_only:
+            last = conn.execute('SELECT MAX(started_at) FROM job_runs WHERE job = ?', (job.name,)).fetchone()[0]
+        # Runs that fell due while nobody held the lease happen once, straight away
+        job.plan(datetime.strptime(last, TIME_FORMAT) if last else now)
+
+    def _running_elsewhere(self, conn, job, now):
+        cutoff = (now - timedelta(seconds=job.max_runtime)).strftime(TIME_FORMAT)
+        conn.execute('''
+            UPDATE job_runs SET status = 'abandoned'
+            WHERE job = ? AND status = 'running' AND started_at < ?
+        ''', (job.name, cutoff))
+        conn.commit()
+        return conn.execute("SELECT 1 FROM job_runs WHERE job = ? AND status = 'running' AND started_at >= ?",
+                            (job.name, cutoff)).fetchone() is not None
+
+    def _check_runtime(self, conn, job):
+        if not job.running() or job.timed_out or time.monotonic() - job.started <= job.max_runtime:
+            return
+        job.timed_out = True
+        logger.warning('%s has run for more than %ss', job.name, job.max_runtime)
+        if job.run_id is not None:
+            conn.execute("UPDATE job_runs SET status = 'timeout' WHERE id = ? AND status = 'running'",
+                         (job.run_id,))
+            conn.commit()
+
+    def _launch(self, conn, job, now):
+        job.run_id = None
+        if job.leader_only:
+            job.run_id = conn.execute(
+                "INSERT INTO job_runs (job, status, holder, started_at) VALUES (?, 'running', ?, ?)",
+                (job.name, self.holder, now.strftime(TIME_FORMAT))).lastrowid
+            conn.commit()
+        job.started = time.monotonic()
+        job.timed_out = False
+        job.thread = threading.Thread(target=self._execute, args=(job, job.run_id),
+                                      name=f'job-{job.name}', daemon=True)
+        job.thread.start()
+
+    def _execute(self, job, run_id):
+        started = time.monotonic()
+        status, result, error = 'ok', None, None
+        try:
+            result = _result_json(job.func())
+        except Exception as e:
+            status, error = 'failed', f'{type(e).__name__}: {e}'
+            logger.exception('Job %s failed', job.name)
+        duration = time.monotonic() - started
+
+        try:
+            if run_id is not None:
+                conn = db_pool.get_connection(self.db_path)
+                conn.rollback()
+                conn.execute('''
+                    UPDATE job_runs
+                    SET status = CASE WHEN status = 'running' THEN ? ELSE status END,
+                        finished_at = ?, duration_seconds = ?, result = ?, error = ?
+                    WHERE id = ?
+                ''', (status, datetime.now().strftime(TIME_FORMAT), round(duration, 3), result, error, run_id))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning('Recording the %s run failed: %s', job.name, e)
+        finally:
+            db_pool.close_all()
+
+
+def run_now(job, db_path=None):
+    """Run a job in the calling thread and record it (command line use)."""
+    conn = db_pool.get_connection(db_path)
+    now = datetime.now()
+    run_id = conn.execute(
+        "INSERT INTO job_runs (job, status, holder, started_at) VALUES (?, 'running', ?, ?)",
+        (job.name, f'{socket.gethostname()}:{os.getpid()}:manual', now.strftime(TIME_FORMAT))).lastrowid
+    conn.commit()
+    _scheduler._execute(job, run_id)
+    return db_pool.get_connection(db_path).execute('SELECT * FROM job_runs WHERE id = ?', (run_id,)).fetchone()
+
+
+def leader(conn):
+    """The current lease holder, or None when the lease has run out."""
+    row = conn.execute('SELECT holder, expires_at FROM scheduler_leases WHERE name = ?',
+                       (LEASE_NAME,)).fetchone()
+    return row['holder'] if row and row['expires_at'] > time.time() else None
+
+
+def history(conn, limit=50):
+    """The latest runs, newest first."""
+    rows = conn.execute('SELECT * FROM job_runs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+    runs = []
+    for row in rows:
+        run = dict(row)
+        run['result'] = json.loads(run['result']) if run['result'] else None
+        runs.append(run)
+    return runs
+
+
+def prune_history(conn, keep_days=30):
+    """Delete job runs older than keep_days; returns how many went."""
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime(TIME_FORMAT)
+    deleted = conn.execute("DELETE FROM job_runs WHERE started_at < ? AND status != 'running'",
+                           (cutoff,)).rowcount
+    conn.commit()
+    return deleted
+
+
+_scheduler = Scheduler()
+atexit.register(_scheduler.release)
+
+
+def register(name, schedule, func, jitter=0, max_runtime=DEFAULT_MAX_RUNTIME, leader_only=True):
+    """Register a job on the process-wide scheduler."""
+    return _scheduler.register(name, schedule, func, jitter, max_runtime, leader_only)
+
+
+def jobs():
+    """The registered jobs by name."""
+    return _scheduler.jobs
+
+
+def start():
+    """Start the process-wide scheduler unless SCHEDULER_ENABLED=0."""
+    if ENABLED:
+        _scheduler.start()
+
+
+def init_app(app):
+    """Start the scheduler in whichever process ends up serving requests."""
+    if ENABLED:
+        app.before_request(_scheduler.start)
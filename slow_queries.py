@@ -0,0 +1,288 @@
+"""
+Slow-query log with automatic plan capture.
+
+Any statement on a pooled connection (get_db() in the routes and
+DatabaseManager.execute_query alike) that takes longer than SLOW_QUERY_MS
+is queued with its fingerprint, parameter shape, duration, row count and
+route. A background thread in each process runs EXPLAIN QUERY PLAN for it
+on its own connection and appends one JSON line to a rotating log, so the
+request that hit the slow statement does no extra work. Parameter values
+are never written, only their types.
+
+The log is summarised by fingerprint (the statement with its literals
+replaced by ?) on /admin/slow_queries or from the command line. The page
+reads only the last RECENT_RECORDS records of the current file, from its
+end (?backups=1 lets it continue into the rotated files); the command
+line reads everything. Set SLOW_QUERY_MS to a negative number to turn
+logging off.
+
+Usage:
+    python slow_queries.py [--log PATH] [--top N] [--sort total|count|max]
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context, request
+
+import db_pool
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+LOG_PATH = os.environ.get('SLOW_QUERY_LOG', os.path.join('logs', 'slow_queries.ndjson'))
+MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_BYTES', 10 * 1024 * 1024))
+BACKUP_COUNT = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 5))
+
+# Records waiting for the logger thread; more than this are dropped
+QUEUE_SIZE = 1000
+
+# Records /admin/slow_queries summarises by default, and the bytes read per
+# step while it walks a file backwards to find them
+RECENT_RECORDS = int(os.environ.get('SLOW_QUERY_RECENT_RECORDS', 5000))
+TAIL_BLOCK = 64 * 1024
+
+# How long an exiting process waits for queued records to be written
+DRAIN_SECONDS = 2.0
+
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+
+def fingerprint(sql):
+    """Collapse a statement to its shape: literals become ? and whitespace is normalised."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\bIN \(\?(?:\s*,\s*\?)+\)', 'IN (?, ...)', sql, flags=re.IGNORECASE)
+    return ' '.join(sql.split())
+
+
+def params_shape(params):
+    """Parameter types without their values: ['str', 'int'] or {'name': 'str'}."""
+    if params is None:
+        return 'executemany'
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+class SlowQueryLog:
+    """Bounded queue of slow statements drained by one logger thread per process."""
+
+    def __init__(self, path=LOG_PATH, threshold_ms=SLOW_QUERY_MS):
+        self.path = path
+        self.threshold = threshold_ms / 1000.0
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each gunicorn worker starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue(QUEUE_SIZE)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+                self._thread.start()
+
+    def observe(self, db_path, sql, params, seconds, rows):
+        """db_pool observer: queue the statement if it was slow."""
+        if seconds < self.threshold or threading.current_thread() is self._thread:
+            return
+        record = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'pid': os.getpid(),
+            'route': request.endpoint if has_request_context() else threading.current_thread().name,
+            'fingerprint': fingerprint(sql),
+            'params': params_shape(params),
+            'duration_ms': round(seconds * 1000, 3),
+            'rows': rows,
+        }
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((db_path, sql, params, record))
+        except queue.Full:
+            self.dropped += 1
+
+    def drain(self, timeout=DRAIN_SECONDS):
+        """Give the logger thread a moment to write what is queued (atexit)."""
+        deadline = time.monotonic() + timeout
+        while self._queue is not None and self._pid == os.getpid() and self._queue.unfinished_tasks \
+                and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _logger(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger = logging.getLogger('slow_queries')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.handlers = [handler]
+        return logger
+
+    def _run(self):
+        logger = self._logger()
+        while True:
+            db_path, sql, params, record = self._queue.get()
+            try:
+                record['plan'] = explain(db_path, sql, params)
+                logger.info(json.dumps(record, default=str))
+            finally:
+                self._queue.task_done()
+
+
+def explain(db_path, sql, params):
+    """EXPLAIN QUERY PLAN details for a statement, or a note why there are none."""
+    if params is None or not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+        return []
+    try:
+        conn = db_pool.get_connection(db_path)
+        return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+
+
+_log = SlowQueryLog()
+
+
+def install():
+    """Start logging slow statements from this process's pooled connections."""
+    if _log.observe not in db_pool.observers and _log.threshold >= 0:
+        db_pool.observers.append(_log.observe)
+        atexit.register(_log.drain)
+
+
+def read_records(path=LOG_PATH):
+    """Every record in the log and its rotated backups, oldest file first."""
+    paths = [f'{path}.{i}' for i in range(BACKUP_COUNT, 0, -1)] + [path]
+    for log_path in paths:
+        try:
+            with open(log_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+
+
+def _lines_backwards(path):
+    """A file's non-empty lines, last first, read backwards in blocks."""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        partial = b''
+        while pos > 0:
+            size = min(TAIL_BLOCK, pos)
+            pos -= size
+            f.seek(pos)
+            pieces = (f.read(size) + partial).split(b'\n')
+            # The first piece may continue in the block before this one
+            partial = pieces[0]
+            for piece in reversed(pieces[1:]):
+                if piece:
+                    yield piece
+        if partial:
+            yield partial
+
+
+def recent_records(path=LOG_PATH, limit=RECENT_RECORDS, backups=False):
+    """
+    The last limit records of the log, oldest first, without reading the
+    rest of it. Rotated backups are only read when backups is true.
+    """
+    paths = [path] + ([f'{path}.{i}' for i in range(1, BACKUP_COUNT + 1)] if backups else [])
+    records = []
+    for log_path in paths:
+        try:
+            for line in _lines_backwards(log_path):
+                if len(records) >= limit:
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        except OSError:
+            continue
+        if len(records) >= limit:
+            break
+    records.reverse()
+    return records
+
+
+def summarize(records, sort='total'):
+    """Aggregate records by fingerprint, slowest first."""
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'rows': 0,
+            'routes': set(),
+            'durations': [],
+        })
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        group['max_ms'] = max(group['max_ms'], record['duration_ms'])
+        group['rows'] += record.get('rows') or 0
+        group['routes'].add(record.get('route') or '')
+        group['durations'].append(record['duration_ms'])
+        # Keep the plan of the latest occurrence
+        group['plan'] = record.get('plan', [])
+        group['last_seen'] = record.get('time')
+
+    summary = []
+    for group in groups.values():
+        durations = sorted(group.pop('durations'))
+        group['p95_ms'] = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        group['avg_ms'] = round(group['total_ms'] / group['count'], 3)
+        group['avg_rows'] = round(group.pop('rows') / group['count'], 1)
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['routes'] = sorted(group['routes'])
+        summary.append(group)
+
+    key = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms'}[sort]
+    summary.sort(key=lambda group: group[key], reverse=True)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarise the slow-query log by fingerprint')
+    parser.add_argument('--log', default=LOG_PATH, help='Log file (rotated backups are read too)')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--sort', choices=('total', 'count', 'max'), default='total')
+    args = parser.parse_args()
+
+    summary = summarize(read_records(args.log), args.sort)
+    if not summary:
+        print(f"✅ No slow queries logged in {args.log}")
+        return 0
+
+    for group in summary[:args.top]:
+        print(f"\n{group['count']}x  total {group['total_ms']:.1f} ms  avg {group['avg_ms']:.1f} ms  "
+              f"p95 {group['p95_ms']:.1f} ms  max {group['max_ms']:.1f} ms  avg rows {group['avg_rows']}")
+        print(f"   routes: {', '.join(group['routes'])}")
+        print(f"   {group['fingerprint']}")
+        for detail in group['plan']:
+            print(f"   | {detail}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+"""
+Inventory write operations shared by the routes and background jobs.
+
+Every function here takes an open connection and leaves committing to the
+caller, so several operations can share one transaction (see write_queue).
+Units are held as lots in blood_units; inventory.units_available follows
+them through triggers, which also log each change in inventory_ledger.
+"""
+
+from datetime import datetime, timedelta
+
+import blood_units
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-']
+
+# Whole blood expires 42 days after donation
+SHELF_LIFE_DAYS = 42
+
+# Status thresholds until forecast.py has issue history for a group
+DEFAULT_LOW_THRESHOLD = 10
+DEFAULT_HIGH_THRESHOLD = 20
+
+
+class StockError(ValueError):
+    """Raised when a stock change cannot be applied."""
+
+
+def calculate_expiry_date(donation_date):
+    """Return the expiry date (YYYY-MM-DD) for a donation date string."""
+    donation_datetime = datetime.strptime(donation_date, '%Y-%m-%d')
+    return (donation_datetime + timedelta(days=SHELF_LIFE_DAYS)).strftime('%Y-%m-%d')
+
+
+def status_for(units, low=DEFAULT_LOW_THRESHOLD, high=DEFAULT_HIGH_THRESHOLD):
+    """The status label for a number of units."""
+    return 'Low Stock' if units < low else 'High Stock' if units > high else 'Normal'
+
+
+def refresh_status(conn, blood_group):
+    """
+    Recompute the status label and days of cover for one blood group.
+
+    Thresholds and the issue rate are the group's own, kept by forecast.py.
+    """
+    conn.execute(f'''
+        UPDATE inventory
+        SET status = CASE
+            WHEN units_available < COALESCE(minimum_threshold, {DEFAULT_LOW_THRESHOLD}) THEN 'Low Stock'
+            WHEN units_available > COALESCE(high_threshold, {DEFAULT_HIGH_THRESHOLD}) THEN 'High Stock'
+            ELSE 'Normal'
+        END,
+        days_of_cover = CASE WHEN issue_rate > 0 THEN ROUND(units_available / issue_rate, 1) END,
+        last_updated = CURRENT_TIMESTAMP
+        WHERE blood_group = ?
+    ''', (blood_group,))
+
+
+def get_stock(conn, blood_group):
+    """Return the inventory row (units_available, status) for a blood group."""
+    return conn.execute('SELECT units_available, status FROM inventory WHERE blood_group = ?',
+                        (blood_group,)).fetchone()
+
+
+def adjust_stock(conn, blood_group, units, action, issued_by=None):
+    """
+    Add or remove units for a blood group and return the updated row.
+
+    Added units become a manual lot expiring after the usual shelf life;
+    removed units are issued oldest-expiry-first.
+    """
+    if blood_group not in BLOOD_GROUPS:
+        raise StockError(f'Unknown blood group: {blood_group}')
+    if action == 'remove':
+        try:
+            blood_units.issue_units(conn, blood_group, units, reason='manual', issued_by=issued_by)
+        except blood_units.InsufficientUnits:
+            raise StockError('Not enough units available')
+    else:
+        today = datetime.today().strftime('%Y-%m-%d')
+        blood_units.add_lots(conn, [{
+            'blood_group': blood_group,
+            'units': units,
+            'source': 'manual',
+            'collected_date': today,
+            'expiry_date': calculate_expiry_date(today),
+        }], created_by=issued_by)
+
+    refresh_status(conn, blood_group)
+    return get_stock(conn, blood_group)
+
+
+def record_donations(conn, donations):
+    """
+    Insert a batch of donations in the caller's transaction.
+
+    Each donation is a dict with donation_id, donor_id, blood_group (the
+    donor's, used for the blood unit lot), units_donated, donation_date,
+    received_by and optionally notes. Donors get their latest donation
+    date stamped, each donation becomes a blood unit lot, and each blood
+    group's status is refreshed once.
+    """
+    conn.executemany('''
+        INSERT INTO donation_history (donation_id, donor_id, units_donated, donation_date,
+                                    expiry_date, received_by, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', [(d['donation_id'], d['donor_id'], d['units_donated'], d['donation_date'],
+           calculate_expiry_date(d['donation_date']), d['received_by'], d.get('notes'))
+          for d in donations])
+
+    # Only move last_donation_date forward, so back-dated entries do not rewind it
+    conn.executemany('''
+        UPDATE donors
+        SET last_donation_date = ?
+        WHERE donor_id = ? AND (last_donation_date IS NULL OR last_donation_date < ?)
+    ''', [(d['donation_date'], d['donor_id'], d['donation_date']) for d in donations])
+
+    # One lot per donation; the lot triggers add the units to inventory.
+    # A batch comes from one form or import, so normally has one receiver.
+    receivers = {d['received_by'] for d in donations}
+    blood_units.add_lots(conn, [{
+        'blood_group': d['blood_group'],
+        'units': d['units_donated'],
+        'donation_id': d['donation_id'],
+        'collected_date': d['donation_date'],
+        'expiry_date': calculate_expiry_date(d['donation_date']),
+    } for d in donations], created_by=receivers.pop() if len(receivers) == 1 else None)
+
+    units_by_group = {}
+    for d in donations:
+        units_by_group[d['blood_group']] = units_by_group.get(d['blood_group'], 0) + d['units_donated']
+    for blood_group in units_by_group:
+        refresh_status(conn, blood_group)
+    return units_by_group
+
+
+def record_donation(conn, donation_id, donor_id, blood_group, units_donated,
+                    donation_date, received_by, notes=None):
+    """Insert a donation, stamp the donor's last donation date and add the units to stock."""
+    record_donations(conn, [{
+        'donation_id': donation_id,
+        'donor_id': donor_id,
+        'blood_group': blood_group,
+        'units_donated': units_donated,
+        'donation_date': donation_date,
+        'received_by': received_by,
+        'notes': notes,
+    }])
+    return donation_id
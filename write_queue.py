@@ -0,0 +1,121 @@
+"""
+Group-commit write queue.
+
+Request handlers hand write commands to a single writer thread per process
+instead of opening their own transactions. The writer collects whatever
+arrives within a few milliseconds, runs the whole batch inside one
+transaction (each command in its own savepoint, so one failure does not
+sink its neighbours) and hands every caller back its own result.
+
+A command is any callable taking the writer's connection as its first
+argument. Commands must not commit; the writer does that once per batch.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import db_pool
+
+BATCH_WINDOW = float(os.environ.get('WRITE_BATCH_WINDOW_MS', 5)) / 1000.0
+MAX_BATCH = int(os.environ.get('WRITE_MAX_BATCH', 64))
+SUBMIT_TIMEOUT = 30
+
+
+class WriteQueue:
+    """Single writer thread that batches commands into shared transactions."""
+
+    def __init__(self, db_path=None, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.db_path = db_path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each gunicorn worker starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+
+    def submit(self, command, *args, **kwargs):
+        """Queue a command and return a Future for its result."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((command, args, kwargs, future))
+        return future
+
+    def execute(self, command, *args, **kwargs):
+        """Queue a command and block until its batch has been committed."""
+        return self.submit(command, *args, **kwargs).result(timeout=SUBMIT_TIMEOUT)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                conn = db_pool.get_connection(self.db_path)
+                self._apply(conn, batch)
+            except Exception as e:
+                for _, _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _apply(self, conn, batch):
+        results = []
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for command, args, kwargs, _ in batch:
+                conn.execute('SAVEPOINT command')
+                try:
+                    results.append((True, command(conn, *args, **kwargs)))
+                    conn.execute('RELEASE SAVEPOINT command')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO SAVEPOINT command')
+                    conn.execute('RELEASE SAVEPOINT command')
+                    results.append((False, e))
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+        for (ok, value), (_, _, _, future) in zip(results, batch):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_writer = WriteQueue()
+
+
+def submit(command, *args, **kwargs):
+    """Queue a command on the process-wide writer."""
+    return _writer.submit(command, *args, **kwargs)
+
+
+def execute(command, *args, **kwargs):
+    """Run a command on the process-wide writer and return its result."""
+    return _writer.execute(command, *args, **kwargs)
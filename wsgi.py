@@ -1,4 +1,8 @@
-from app import app
-
-if __name__ == "__main__":
+import scheduler
+from app import app
+
+# Start leader election at boot rather than on the first request
+scheduler.start()
+
+if __name__ == "__main__":
     app.run()
\ No newline at end of file